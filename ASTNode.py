@@ -15,6 +15,11 @@ class ASTNode:
     def add_siblings(self, siblings):
         self.children.extend(siblings)
 
+    def freeze(self):
+        # Children become tuples, so the tree can be shared (e.g. between threads) without being modified
+        self.children = tuple(child.freeze() for child in self.children)
+        return self
+
     def __repr__(self):
         return self.pretty_print()
 
@@ -1,14 +1,60 @@
 # An interpreter is a program that interprets the AST of the source program on the fly (without compiling it first).
 
+import operator
+from array import array
+
 from Lexer import *
 from Parser import *
 from SymbolTable import *
 
+# Value of a hoisted expression not evaluated yet
+MISSING = object()
+
+BINARY_OPERATORS = ('+', '-', '*', '/', '==', '!=', '<', '<=', '>', '>=', '&&', '||')
+
+# Fast paths of the operator nodes specialized for two Int operands
+INT_OPERATIONS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': lambda left, right: int(left / right),
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+# Kotlin's Int is a 32-bit two's complement integer: with int32 the results of + - * / wrap around
+def wrap32(value):
+    return ((value + 0x80000000) & 0xFFFFFFFF) - 0x80000000
+
+# Fast paths for two Int operands in the 32-bit mode
+# (int(left / right) is exact for 32-bit operands, only Int.MIN_VALUE / -1 needs to wrap)
+INT32_OPERATIONS = dict(INT_OPERATIONS, **{
+    '+': lambda left, right: wrap32(left + right),
+    '-': lambda left, right: wrap32(left - right),
+    '*': lambda left, right: wrap32(left * right),
+    '/': lambda left, right: wrap32(int(left / right)),
+})
+
 class Interpreter:
 
-    # Initialize Symbol Table
-    def __init__(self):
+    # Initialize Symbol Table and I/O streams (None means the standard input/output)
+    def __init__(self, stdin=None, stdout=None, int32=False):
         self.s = None
+        self.stdin = stdin
+        self.stdout = stdout
+        self.hoisted = {} # values hoisted out of the optimized loops that are running, by loop id
+        self.inductions = () # induction values of the optimized 'for' loop being entered
+        self.specialized = {} # operator node -> types it is specialized for ('Int', 'String', 'Boolean', 'generic')
+        self.deoptimized = 0 # specialized nodes that went back to the generic path
+        self.int32 = int32 # Int values are 32-bit and wrap around (Kotlin's semantics)
+        self.int_operations = INT32_OPERATIONS if int32 else INT_OPERATIONS
+        self.captures = {} # nested function declaration -> names of its flat scope (empty: no trimming, see Closures.py)
+        self.calls = None # ParallelCalls whose pool runs the grouped pure calls (see ParallelCalls.py)
+        self.started = {} # futures of the grouped calls started in the pool, by group id
 
     # Create a new scope by defining a new Symbol Table
     def create_scope(self, parent, name):
@@ -18,6 +64,191 @@ class Interpreter:
     def exit_scope(self):
         self.s = self.s.parent
 
+    # Evaluate the top-level declarations of a scriptNode into the root scope (main() is not called)
+    def initialize(self, node):
+
+        self.check_main(node)
+
+        # As soon as the scriptNode is encountered, the first scope is created:
+        # it has no parent since it's the root
+        self.create_scope(None, 'Root') # Root
+        self.evaluate(node.children[0]) #statementsNode
+
+    # Call fun main() once the root scope has been initialized
+    def run_main(self):
+
+        # Public functions and variables are accessible everywhere:
+        # to handle this kind of situation, a (fake) call to fun main() is evaluated after them.
+        # The call is not added to the tree, so the same tree can be evaluated again
+        return self.evaluate(ASTNode('mainCallNode', children = [ASTNode('IDNode', leaf='main')]))
+
+    # Flat scope of a nested function: the nearest record of each variable and the functions of each name,
+    # found in the scopes between the current one and the root (the root scope is its parent).
+    # None if an assigned variable is a 'val' shadowing another declaration: the assignment checks all of them
+    def closure_scope(self, variables, functions, assigned):
+
+        root = self.s
+        while root.parent:
+            root = root.parent
+        closure = SymbolTable(root, 'closure')
+
+        table = self.s
+        while table is not root:
+            for name in table.variables.keys() & variables:
+                if name not in closure.variables:
+                    closure.variables[name] = table.variables[name]
+                elif name in assigned and not closure.variables[name].var:
+                    return None
+            for key, function in table.functions.items():
+                # nearer declarations come first, as in SymbolTable.get_function
+                if key[0] in functions and key not in closure.functions:
+                    closure.functions[key] = function
+            table = table.parent
+
+        return closure
+
+    # Read a line from the input stream (line: Kotlin line of the readLine() call, for the subclasses)
+    def read_line(self, line=None):
+
+        if self.stdin is None:
+            return input()
+
+        result = self.stdin.readline()
+        if not result:
+            return None # end of input: Kotlin's readLine() returns null
+        return result.rstrip('\n')
+
+    # Write a value of println() to the output stream
+    def write_line(self, value, line=None):
+        print(value, file=self.stdout)
+
+    # Find the function called by a functionCallNode: the overload is chosen by the types of the arguments
+    def resolve_function(self, node, name, arguments):
+
+        if not self.s.is_function_declared(name, arguments):
+            raise Exception(f"Function '{name}' not declared, line {node.line}")
+
+        return self.s.get_function(name, arguments)
+
+    # Binary operation on already evaluated operands
+    @staticmethod
+    def binary_operation(node, left, right):
+
+        if node.value in ('+', '-', '*', '/'):
+
+            op = node.value
+            if op == '+':
+
+                if isinstance(left, int) and isinstance(right, int):
+                    return left + right
+
+                if isinstance(left, str):
+                    return left + str(right) # String Concatenation
+
+                raise Exception(f"Operation is not supported, line {node.line}")
+
+            # Check both operands are Integer
+            if not isinstance(left, int) or not isinstance(right, int):
+                raise TypeError(f"Both operands must be 'Integer', "
+                                f"got {getType(left)} and {getType(right)}"
+                                f", line {node.line}")
+
+            # Perform the arithmetic operation
+
+            elif op == '-':
+                return left - right
+            elif op == '*':
+                return left * right
+            elif op == '/':
+                # Handling division by zero
+                if right == 0:
+                    raise ZeroDivisionError(f"Division by zero is not allowed, line {node.line}")
+                return int(left / right)
+
+        elif node.value in ('==', '!=', '<', '<=', '>', '>='):
+
+            if not (getType(left) == getType(right)):
+                raise TypeError(f"Cannot compare different types of operands ({getType(left)}, {getType(right)}),"
+                                f" line {node.line}")
+
+            op = node.value
+
+            if op == '==':
+                return left == right
+            elif op == '!=':
+                return left != right
+            if op == '<':
+                return left < right
+            elif op == '<=':
+                return left <= right
+            elif op == '>':
+                return left > right
+            elif op == '>=':
+                return left >= right
+
+        elif node.value in ('&&', '||'):
+
+            # Check both operands are boolean
+            if not isinstance(left, bool) or not isinstance(right, bool):
+                raise TypeError(f"Both operands must be Boolean: got {getType(left)} and {getType(right)}, line {node.line}")
+
+            op = node.value
+            if op == '&&':
+                return left and right
+            elif op == '||':
+                return left or right
+
+    # Specialization of an operator node for the types of the operands of its first evaluation
+    @staticmethod
+    def specialize(op, left, right):
+        if type(left) is int and type(right) is int and op in INT_OPERATIONS:
+            return 'Int'
+        if type(left) is str and op == '+':
+            return 'String'
+        if type(left) is bool and type(right) is bool and op in ('&&', '||'):
+            return 'Boolean'
+        return 'generic'
+
+    # The types of the operands of a specialized node have changed: it goes back to the generic path for good
+    def deoptimize(self, node):
+        self.specialized[node] = 'generic'
+        self.deoptimized += 1
+
+    # Statements and return value (None if the function has no return type) of a function declaration
+    @staticmethod
+    def function_body(node):
+
+        if node.children[-2].value == 'typeParameterNode':
+            if node.children[-1].value == 'statementsNode':
+                block = list(node.children[-1].children)
+                block.pop()
+                returnValue = node.children[-1].children[-1].children[0] # returnNode
+            else:
+                block = []
+                returnValue = node.children[-1].children[0] # returnNode
+        else:
+            block = node.children[-1].children
+            returnValue = None
+
+        return block, returnValue
+
+    # Without a main, code can't run: it checks that there is one and only one main() function
+    @staticmethod
+    def check_main(node):
+        if sum(1 for child in node.children[0].children if child.value == 'mainNode') != 1:
+            raise Exception("One main function is requested! Can't run code")
+
+    # Check that an IntArray is indexed with an Int inside its bounds
+    @staticmethod
+    def check_index(elements, index, line):
+        if not isinstance(elements, array):
+            raise TypeError(f"Only IntArray can be indexed, got {getType(elements)}, line {line}")
+        if getType(index) != 'Int':
+            raise TypeError(f"Array index must be Int, got {getType(index)}, line {line}")
+        if not 0 <= index < len(elements):
+            raise IndexError(f"Index {index} out of bounds for length {len(elements)}, line {line}")
+        return index
+
     def evaluate(self, node):
         if node is None:
             return None
@@ -25,22 +256,8 @@ class Interpreter:
         # Script Node
         elif node.value == 'scriptNode':
 
-            lista = node.children[0].children
-
-            # Without a main, code can't run: it checks that there is one and only one main() function
-            if sum(1 for child in lista if child.value == 'mainNode') != 1:
-                raise Exception("One main function is requested! Can't run code")
-
-            # Public functions and variables are accessible everywhere:
-            # to handle this kind of situation, a (fake) call to fun main() is added
-            lista.append(ASTNode('mainCallNode', children = [ASTNode('IDNode', leaf='main')]))
-
-            # As soon as the scriptNode is encountered, the first scope is created:
-            # it has no parent since it's the root
-            self.create_scope(None, 'Root') # Root
-            value = self.evaluate(node.children[0]) #statementsNode
-
-            return value
+            self.initialize(node)
+            return self.run_main()
 
         # Statements Node
         elif node.value == 'statementsNode':
@@ -62,7 +279,8 @@ class Interpreter:
                 var_type = node.children[2].leaf # typeParameterNode
                 if (var_type == 'Int' and isinstance(var_value, int)) \
                         or (var_type == 'String' and isinstance(var_value, str)) \
-                        or (var_type == 'Boolean' and isinstance(var_value, bool)):
+                        or (var_type == 'Boolean' and isinstance(var_value, bool)) \
+                        or (var_type == 'IntArray' and isinstance(var_value, array)):
 
                     self.s.declare_variable(node.children[0].leaf, var_name, var_value, var_type, node.line)
 
@@ -102,6 +320,27 @@ class Interpreter:
 
             return var_value
 
+        # Index Assignment Node
+        elif node.value == 'indexAssignmentNode':
+
+            if not self.s.check_father():
+                raise Exception(f"Excepting a top level declaration, line {node.line} ")
+
+            elements = self.evaluate(node.children[0]) # IntArray
+            index = self.check_index(elements, self.evaluate(node.children[1]), node.line)
+            var_value = self.evaluate(node.children[2]) # Value
+
+            if getType(var_value) != 'Int':
+                raise TypeError(f"Cannot assign value of type {getType(var_value)} to an element of IntArray, "
+                                f"line {node.line}")
+
+            try:
+                elements[index] = var_value
+            except OverflowError:
+                raise OverflowError(f"Value {var_value} does not fit in an IntArray element, line {node.line}")
+
+            return var_value
+
         # If_expression Node and If_else_expression Node
         elif node.value in ('if_expressionNode', 'if_else_expressionNode'):
 
@@ -170,6 +409,9 @@ class Interpreter:
         # For Statement Node
         elif node.value == 'forStatementNode':
 
+            reductions = self.inductions # induction values updated at each iteration
+            self.inductions = ()
+
             if not self.s.check_father():
                 raise Exception(f"Excepting a top level declaration, line {node.line}")
 
@@ -209,8 +451,16 @@ class Interpreter:
             else:
                 end += 1
 
+            # Strength reduction: 'i * factor' starts from 'start * factor' and grows by 'step * factor'
+            reductions = [[values, slot, start * factor, step * factor] for values, slot, factor in reductions]
+
             for i in range(start, end, step):
 
+                for reduction in reductions:
+                    values, slot, current, delta = reduction
+                    values[slot] = wrap32(current) if self.int32 else current
+                    reduction[2] = current + delta
+
                 # create a new scope each time I enter the 'for' block for variables' range
                 parent = self.s
                 self.create_scope(parent, 'variables')
@@ -234,90 +484,119 @@ class Interpreter:
 
             return value
 
-        elif node.value in ('+', '-', '*', '/'):
+        # Optimized Loop Node: the values hoisted out of the loop are computed again each time the loop is entered
+        elif node.value == 'optimizedLoopNode':
 
-            if len(node.children) == 1: # Unary MINUS
-                operand = self.evaluate(node.children[0])
-                if not isinstance(operand, int):
-                    raise TypeError(f"Operand must be 'Integer', line {node.line}")
-                return -operand
+            loop_id, slots, inductions = node.leaf
+            saved = self.hoisted.get(loop_id) # the same loop may be running in a recursive call
 
-            left = self.evaluate(node.children[0])
-            right = self.evaluate(node.children[1])
+            values = [MISSING] * slots
+            self.hoisted[loop_id] = values
+            self.inductions = tuple((values, slot, factor) for slot, factor in inductions)
 
-            op = node.value
-            if op == '+':
+            try:
+                return self.evaluate(node.children[0])
+            finally:
+                self.hoisted[loop_id] = saved
 
-                if isinstance(left, int) and isinstance(right, int):
-                    return left + right
+        # Invariant Node: a loop-invariant expression, evaluated the first time it is reached
+        elif node.value == 'invariantNode':
 
-                if isinstance(left, str):
-                    return left + str(right) # String Concatenation
+            loop_id, slot = node.leaf
+            values = self.hoisted[loop_id]
+            if values[slot] is MISSING:
+                values[slot] = self.evaluate(node.children[0])
+            return values[slot]
 
-                raise Exception(f"Operation is not supported, line {node.line}")
+        # Induction Node: 'i * factor' of a 'for' loop, updated by the loop at each iteration
+        elif node.value == 'inductionNode':
 
-            # Check both operands are Integer
-            if not isinstance(left, int) or not isinstance(right, int):
-                raise TypeError(f"Both operands must be 'Integer', "
-                                f"got {getType(left)} and {getType(right)}"
-                                f", line {node.line}")
+            loop_id, slot = node.leaf
+            return self.hoisted[loop_id][slot]
 
-            # Perform the arithmetic operation
+        # Parallel Group Node: the pure calls of an expression are started together in the process pool
+        elif node.value == 'parallelGroupNode':
 
-            elif op == '-':
-                return left - right
-            elif op == '*':
-                return left * right
-            elif op == '/':
-                # Handling division by zero
-                if right == 0:
-                    raise ZeroDivisionError(f"Division by zero is not allowed, line {node.line}")
-                return int(left / right)
+            if self.calls is None:
+                return self.evaluate(node.children[0])
 
-        elif node.value in ('==', '!=', '<', '<=', '>', '>='):
+            group_id = node.leaf
+            saved = self.started.get(group_id) # the same expression may be evaluated by a recursive call
+            started = self.calls.start(self, group_id)
+            self.started[group_id] = started
+
+            try:
+                return self.evaluate(node.children[0])
+            finally:
+                self.started[group_id] = saved
+                for future in started:
+                    future.cancel() # not needed (e.g. after && or ||, or after an error)
+
+        # Parallel Call Node: a grouped call takes its result from the pool if it was started there
+        elif node.value == 'parallelCallNode':
+
+            group_id, position = node.leaf
+            started = self.started.get(group_id)
+            if started and position < len(started):
+                return started[position].result() # errors are raised again with their type and message
+            return self.evaluate(node.children[0])
+
+        # Binary Operation Node: after its first evaluation the node is specialized for the types of its operands
+        elif node.value in BINARY_OPERATORS and len(node.children) == 2:
+
+            op = node.value
             left = self.evaluate(node.children[0])
+
+            # && and || short-circuit: the right operand is not evaluated if the left one decides the result
+            if op in ('&&', '||') and left is (op == '||'):
+                return left
+
             right = self.evaluate(node.children[1])
+            kind = self.specialized.get(node)
 
-            if not (getType(left) == getType(right)):
-                raise TypeError(f"Cannot compare different types of operands ({getType(left)}, {getType(right)}),"
-                                f" line {node.line}")
+            if kind is None:
+                self.specialized[node] = self.specialize(op, left, right)
 
-            op = node.value
+            elif kind == 'Int':
+                if type(left) is int and type(right) is int:
+                    if op != '/' or right != 0: # division by zero is reported by the generic path
+                        return self.int_operations[op](left, right)
+                else:
+                    self.deoptimize(node)
 
-            if op == '==':
-                return left == right
-            elif op == '!=':
-                return left != right
-            if op == '<':
-                return left < right
-            elif op == '<=':
-                return left <= right
-            elif op == '>':
-                return left > right
-            elif op == '>=':
-                return left >= right
+            elif kind == 'String':
+                if type(left) is str:
+                    return left + str(right)
+                self.deoptimize(node)
 
-        elif node.value in ('&&', '||', '!'):
+            elif kind == 'Boolean':
+                if type(left) is bool and type(right) is bool:
+                    return right # the left operand didn't decide the result
+                self.deoptimize(node)
 
-            if node.value == '!': # Unary Logic Operation
-                operand = self.evaluate(node.children[0])
-                if not isinstance(operand, bool):
-                    raise TypeError(f"Cannot evaluate operand {getType(operand)} in a NOT statement, "
-                                    f"must be Boolean, line {node.line}")
-                return not operand
+            result = self.binary_operation(node, left, right)
+            if self.int32 and type(result) is int:
+                return wrap32(result)
+            return result
 
-            left = self.evaluate(node.children[0])
-            right = self.evaluate(node.children[1])
+        # Unary MINUS
+        elif node.value == '-':
 
-            # Check both operands are boolean
-            if not isinstance(left, bool) or not isinstance(right, bool):
-                raise TypeError(f"Both operands must be Boolean: got {getType(left)} and {getType(right)}, line {node.line}")
+            operand = self.evaluate(node.children[0])
+            if not isinstance(operand, int):
+                raise TypeError(f"Operand must be 'Integer', line {node.line}")
+            if self.int32:
+                return wrap32(-operand) # -Int.MIN_VALUE is Int.MIN_VALUE
+            return -operand
 
-            op = node.value
-            if op == '&&':
-                return left and right
-            elif op == '||':
-                return left or right
+        # Unary Logic Operation
+        elif node.value == '!':
+
+            operand = self.evaluate(node.children[0])
+            if not isinstance(operand, bool):
+                raise TypeError(f"Cannot evaluate operand {getType(operand)} in a NOT statement, "
+                                f"must be Boolean, line {node.line}")
+            return not operand
 
         elif node.value == 'termNode':
             return node.leaf # it's just a value
@@ -330,14 +609,44 @@ class Interpreter:
 
             return self.s.get_variable(var_name)
 
+        # IntArray Node: IntArray(n) creates an array of n zeros
+        elif node.value == 'intArrayNode':
+
+            size = self.evaluate(node.children[0])
+            if getType(size) != 'Int':
+                raise TypeError(f"IntArray size must be Int, got {getType(size)}, line {node.line}")
+            if size < 0:
+                raise ValueError(f"IntArray size must be non-negative, got {size}, line {node.line}")
+
+            # elements are stored unboxed and contiguous as signed machine integers (32-bit ones with int32)
+            if self.int32:
+                return array('i', bytes(4 * size))
+            return array('q', bytes(8 * size))
+
+        # Array Access Node
+        elif node.value == 'arrayAccessNode':
+
+            elements = self.evaluate(node.children[0]) # IntArray
+            index = self.check_index(elements, self.evaluate(node.children[1]), node.line)
+
+            return elements[index]
+
+        # Array Size Node
+        elif node.value == 'arraySizeNode':
+
+            elements = self.evaluate(node.children[0])
+            if node.leaf != 'size' or not isinstance(elements, array):
+                raise Exception(f"Unresolved reference '{node.leaf}' on {getType(elements)}, line {node.line}")
+
+            return len(elements)
+
         # Readline Node
         elif node.value == 'readLineNode':
 
             if not self.s.check_father():
                 raise Exception(f"Excepting a top level declaration, line {node.line}")
 
-            result = input()
-            return result
+            return self.read_line(node.line)
 
         # Print Node
         elif node.value == 'printlnNode':
@@ -346,7 +655,7 @@ class Interpreter:
                 raise Exception(f"Excepting a top level declaration, line {node.line}")
 
             value = self.evaluate(node.children[0])
-            print(value)
+            self.write_line(value, node.line)
 
             return value
 
@@ -367,21 +676,20 @@ class Interpreter:
             else:
                 returnType = None
 
-            if node.children[-2].value == 'typeParameterNode':
-                if node.children[-1].value == 'statementsNode':
-                    block = node.children[-1].children.copy()
-                    block.pop()
-                    returnValue = node.children[-1].children[-1].children[0] # returnNode
-                else:
-                    block = []
-                    returnValue = node.children[-1].children[0] # returnNode
+            if node.children[-1].value == 'lazyBodyNode':
+                block, returnValue = node.children[-1], None # parsed by the first call
             else:
-                block = node.children[-1].children
-                returnValue = None
+                block, returnValue = self.function_body(node)
 
             # Function declaration in SymbolTable
             self.s.declare_function(name, parameters, block, returnType, returnValue, self.s, node.line)
 
+            # A nested function only keeps the variables and functions it references
+            captured = self.captures.get(node)
+            closure = self.closure_scope(*captured) if captured is not None else None
+            if closure is not None:
+                self.s.functions[(name, parameters)]['scope'] = closure
+
             return None
 
         # Function Value Parameters Node
@@ -411,13 +719,13 @@ class Interpreter:
             else:
                 arguments = ()
 
-            if not self.s.is_function_declared(name, arguments):
-                raise Exception(f"Function '{name}' not declared, line {node.line}")
-
-            F = self.s.get_function(name, arguments)
+            F = self.resolve_function(node, name, arguments)
             function = F[0]
             parameters = F[1]
 
+            if isinstance(function['body'], ASTNode): # lazyBodyNode: the body is parsed by the first call
+                function['body'], function['returnValue'] = self.function_body(function['body'].leaf.parse())
+
             body = function['body']
             returnType = function['returnType']
             returnValue = function['returnValue']
@@ -9,7 +9,9 @@ tokens = ('ID', 'ASSIGN', 'NUMBER', 'LITERAL', # identifiers
           'EQUALS', 'NEQUALS', 'GT', 'LT', 'GTE', 'LTE',  # comparison operators
           'MINUS', 'PLUS', 'TIMES', 'DIVIDE', # arithmetic operators
           'SLCOMM', 'MLCOMM',  # comment
-          'LBRACE', 'RBRACE', 'LPAREN', 'RPAREN', 'COMMA', 'COLONS', 'SEMI', 'RANGE' # grammar
+          'LBRACE', 'RBRACE', 'LPAREN', 'RPAREN', 'COMMA', 'COLONS', 'SEMI', 'RANGE', # grammar
+          'LBRACKET', 'RBRACKET', 'DOT', # arrays
+          'LAZYBODY' # function body not parsed yet (produced by Parser.lazy_tokens, never by the lexer)
           )
 
 # Reserved keywords
@@ -17,6 +19,7 @@ reserved = {
     'Int': 'INT',
     'Boolean': 'BOOLEAN',
     'String': 'STRING',
+    'IntArray': 'INTARRAY',
     'val': 'VAL',
     'var': 'VAR',
     'true': 'TRUE',
@@ -57,11 +60,14 @@ t_ASSIGN = r'='
 t_LPAREN = r'\('
 t_RPAREN = r'\)'
 t_RANGE = r'\.\.'
+t_DOT = r'\.'
 t_SEMI = r';'
 t_COLONS = r':'
 t_COMMA = r', '
 t_LBRACE = r'\{'
 t_RBRACE = r'\}'
+t_LBRACKET = r'\['
+t_RBRACKET = r'\]'
 t_ignore = ' \t'  # string containing ignored characters (spaces and tabs)
 
 # Regular expression rules with some action code
@@ -105,6 +111,10 @@ def t_error(t):
     t.lexer.skip(1)
     print(f"Illegal character '{t.value[0]}' at line {t.lexer.lineno}")
 
+def skip_error(t):
+    # Error rule for lexers that scan text already lexed (and reported) by another lexer
+    t.lexer.skip(1)
+
 # Track new lines
 def t_newline(t):
     r'\n+' # match for a new line
@@ -112,3 +122,9 @@ def t_newline(t):
 
 # Build the lexer
 lexer = lex.lex()
+
+def build_lexer():
+    # Independent lexer: it shares only the (read-only) compiled rules with the module-level lexer
+    new_lexer = lexer.clone()
+    new_lexer.lineno = 1
+    return new_lexer
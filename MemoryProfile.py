@@ -0,0 +1,193 @@
+# Memory profiling.
+# A profiling run traces the Python allocations (tracemalloc) and attributes them to the Kotlin code:
+# every node of the AST is charged with the bytes it allocated itself (its children are charged on their own)
+# under the Kotlin function running it, the kind of its scope ('function', 'variables', 'for', 'while', 'if',
+# 'else', 'Root') and its source line.
+# Bytes still allocated when a node ends (e.g. the scopes captured by a nested function, long strings)
+# are the ones it keeps alive; the peak is the highest traced memory reached while the node was running.
+# A timeline samples the peak every few evaluated nodes.
+
+import os
+import sys
+import tracemalloc
+
+from Interpreter import *
+
+SCRIPT = '<script>' # "function" of the top-level declarations
+
+# Fields of the frame of a running node
+START, PEAK, CHILDREN, KEY = range(4)
+
+def ast_size(tree):
+    # Nodes of the tree and their approximate size in bytes
+    nodes = 0
+    total = 0
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        nodes += 1
+        total += sys.getsizeof(node) + sys.getsizeof(node.__dict__) + sys.getsizeof(node.children)
+        if isinstance(node.leaf, str):
+            total += sys.getsizeof(node.leaf)
+        stack.extend(node.children)
+    return nodes, total
+
+def size(count):
+    for unit in ('B', 'KiB', 'MiB'):
+        if abs(count) < 1024:
+            return f"{count:.0f} {unit}" if unit == 'B' else f"{count:.1f} {unit}"
+        count /= 1024
+    return f"{count:.1f} GiB"
+
+class MemoryProfile:
+    def __init__(self, tree):
+        self.entries = {} # (function, scope kind, line) -> [allocated bytes, freed bytes, evaluations, peak bytes]
+        self.timeline = [] # (evaluated nodes, traced bytes, peak bytes since the previous sample, function, line)
+        self.peak = 0
+        self.peak_key = None # (function, scope kind, line) running when the peak was reached
+        self.ast = ast_size(tree)
+        self.live = [] # (interpreter source line, bytes) still allocated when the program ended
+
+    def group(self, field):
+        # Allocated and freed bytes, evaluations and peak summed (peak: maximum) by a field of the keys
+        groups = {}
+        for key, (allocated, freed, count, peak) in self.entries.items():
+            total = groups.setdefault(key[field], [0, 0, 0, 0])
+            total[0] += allocated
+            total[1] += freed
+            total[2] += count
+            total[3] = max(total[3], peak)
+        return groups
+
+    def report(self, top=10):
+
+        """
+        Describe the top consumers of memory and the timeline of the peak usage
+        :param top: number of entries of each section
+        :return: lines of the report
+        """
+
+        lines = [f"Peak: {size(self.peak)}" + (" in {} ({} scope, line {})".format(*self.peak_key)
+                                               if self.peak_key else ""),
+                 f"AST: {self.ast[0]} nodes, about {size(self.ast[1])}"]
+
+        for title, field in (('function', 0), ('scope kind', 1), ('line', 2)):
+            lines.append(f"Top consumers by {title}:")
+            groups = sorted(self.group(field).items(), key=lambda item: (-item[1][0], str(item[0])))[:top]
+            for name, (allocated, freed, count, peak) in groups:
+                lines.append(f"  {name}: allocated {size(allocated)}, freed {size(freed)}, "
+                             f"net {size(allocated - freed)}, peak live {size(peak)}, {count} evaluations")
+
+        lines.append("Peak timeline:")
+        samples = self.timeline
+        if len(samples) > top:
+            samples = [samples[len(samples) * i // top] for i in range(top)] + [samples[-1]]
+        for evaluations, current, peak, function, line in samples:
+            lines.append(f"  after {evaluations} nodes: {size(current)} (peak {size(peak)}) in {function}, line {line}")
+
+        if self.live:
+            lines.append("Live at the end, by interpreter line:")
+            for where, count in self.live[:top]:
+                lines.append(f"  {where}: {size(count)}")
+
+        return lines
+
+class MemoryProfilingInterpreter(Interpreter):
+    def __init__(self, tree, stdin=None, stdout=None, int32=False, interval=1000):
+
+        """
+        Interpreter that attributes the traced allocations to the Kotlin code while it runs
+        :param tree: tree that will be evaluated
+        :param interval: evaluated nodes between two samples of the timeline
+        """
+
+        super().__init__(stdin, stdout, int32)
+        self.profile = MemoryProfile(tree)
+        self.interval = interval
+        self.function = SCRIPT # Kotlin function whose body is running
+        self.frames = [] # running nodes: [traced bytes at start, peak bytes, bytes kept by children, key]
+        self.evaluations = 0
+        self.window = 0 # peak since the last sample of the timeline
+
+    def run(self, tree):
+
+        """
+        Evaluate the tree tracing its allocations
+        :return: value returned by main()
+        """
+
+        tracing = tracemalloc.is_tracing() # tracing started by the caller is left running
+        if not tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        try:
+            return self.evaluate(tree)
+        finally:
+            snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, __file__)])
+            self.profile.live = [(f"{os.path.basename(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+                                  stat.size) for stat in snapshot.statistics('lineno')]
+            if not tracing:
+                tracemalloc.stop()
+
+    def boundary(self, peak):
+        # The peak since the last boundary was reached while the innermost running node was running
+        tracemalloc.reset_peak()
+        if self.frames and peak > self.frames[-1][PEAK]:
+            self.frames[-1][PEAK] = peak
+        if peak > self.profile.peak:
+            self.profile.peak = peak
+            self.profile.peak_key = self.frames[-1][KEY] if self.frames else None
+        if peak > self.window:
+            self.window = peak
+
+    def evaluate(self, node):
+        if node is None: # e.g. the missing return value of a function
+            return super().evaluate(node)
+
+        current, peak = tracemalloc.get_traced_memory()
+        self.boundary(peak)
+
+        # Operator nodes have no line: they are charged to the line of the enclosing statement
+        line = node.line or (self.frames[-1][KEY][2] if self.frames else None)
+        key = (self.function, self.s.name if self.s else 'Root', line)
+        self.frames.append([current, current, 0, key])
+
+        self.evaluations += 1
+        if self.evaluations % self.interval == 0:
+            self.profile.timeline.append((self.evaluations, current, self.window, key[0], line))
+            self.window = current
+
+        function = self.function
+        try:
+            return super().evaluate(node)
+        finally:
+            self.function = function # the caller's body runs again after a call
+
+            current, peak = tracemalloc.get_traced_memory()
+            self.boundary(peak)
+            frame = self.frames.pop()
+
+            kept = current - frame[START]
+            own = kept - frame[CHILDREN]
+            entry = self.profile.entries.get(key)
+            if entry is None:
+                entry = self.profile.entries[key] = [0, 0, 0, 0]
+            if own > 0:
+                entry[0] += own
+            else:
+                entry[1] -= own
+            entry[2] += 1
+            if frame[PEAK] > entry[3]:
+                entry[3] = frame[PEAK]
+
+            if self.frames:
+                parent = self.frames[-1]
+                parent[CHILDREN] += kept
+                if frame[PEAK] > parent[PEAK]:
+                    parent[PEAK] = frame[PEAK]
+
+    def resolve_function(self, node, name, arguments):
+        # The body of the called function runs after this (the arguments have been evaluated)
+        function = super().resolve_function(node, name, arguments)
+        self.function = name
+        return function
@@ -0,0 +1,157 @@
+# Loop optimizer: it rewrites a copy of the AST applying
+# 1) loop-invariant code motion: expressions that only depend on variables the loop never declares or assigns
+#    are computed once each time the loop is entered (invariantNode)
+# 2) strength reduction: multiplications 'i * constant' of a 'for' identifier become a running value,
+#    updated with an addition at each iteration (inductionNode)
+#
+# Invariant expressions are evaluated lazily, when they are reached for the first time:
+# a loop that is never entered, or an error raised by the expression, behaves exactly as without the optimizer.
+
+from ASTNode import *
+
+# Operators without side effects
+OPERATORS = ('+', '-', '*', '/', '==', '!=', '<', '<=', '>', '>=', '&&', '||', '!')
+
+# Expression nodes that can be hoisted when their operands are invariant
+PURE = OPERATORS + ('arraySizeNode',)
+
+LOOPS = ('whileStatementNode', 'forStatementNode')
+FUNCTIONS = ('functionDeclarationNode', 'mainNode')
+
+def walk(node):
+    # Every node of the subtree (node included)
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        yield current
+        stack.extend(current.children)
+
+def assigned_names(node):
+    # Names of the variables assigned in the subtree
+    return {n.children[0].leaf for n in walk(node) if n.value == 'assignmentNode'}
+
+def declared_names(node):
+    # Names of the variables, 'for' identifiers and parameters declared in the subtree
+    names = set()
+    for n in walk(node):
+        if n.value == 'variableDeclarationNode':
+            names.add(n.children[1].leaf)
+        elif n.value == 'forStatementNode':
+            names.add(n.children[0].leaf)
+        elif n.value == 'functionValueParametersNode':
+            names.update(n.children[i].leaf for i in range(0, len(n.children), 2))
+    return names
+
+def has_calls(node):
+    # A called function may assign any variable it can see
+    return any(n.value == 'functionCallNode' for n in walk(node))
+
+class Optimizer:
+    def __init__(self):
+        self.loops = 0 # optimized loops, each one has its own slots for hoisted values
+        self.assigned = set() # variables assigned somewhere in the program
+
+    def optimize(self, tree):
+
+        """
+        Optimize the loops of a program
+        :param tree: scriptNode (it is not modified)
+        :return: optimized copy of the tree
+        """
+
+        self.assigned = assigned_names(tree)
+        return self.visit(tree)
+
+    def visit(self, node):
+        if node.value in LOOPS:
+            return self.visit_loop(node)
+        return ASTNode(node.value, [self.visit(child) for child in node.children], node.leaf, node.line)
+
+    def visit_loop(self, node):
+
+        loop_id = self.loops
+        self.loops += 1
+
+        variant = assigned_names(node) | declared_names(node)
+        if has_calls(node):
+            variant |= self.assigned
+
+        slots = [] # each slot is an invariant expression or an induction value
+        inductions = [] # (slot, factor) of the induction values
+
+        children = list(node.children)
+        if node.value == 'whileStatementNode':
+            children[0] = self.hoist_root(children[0], variant, loop_id, slots) # condition
+        else:
+            body = children[-1]
+            identifier = children[0].leaf
+            if identifier not in declared_names(body) | assigned_names(body):
+                body = self.reduce(body, identifier, loop_id, slots, inductions)
+            children[-1] = body
+        children[-1] = self.hoist_root(children[-1], variant, loop_id, slots) # body
+
+        # Nested loops and functions are optimized on their own
+        loop = ASTNode(node.value, [self.visit(child) for child in children], node.leaf, node.line)
+
+        if not slots:
+            return loop
+        return ASTNode('optimizedLoopNode', [loop], leaf=(loop_id, len(slots), tuple(inductions)), line=node.line)
+
+    def hoist_root(self, node, variant, loop_id, slots):
+        node, invariant = self.hoist(node, variant, loop_id, slots)
+        return self.wrap(node, invariant, loop_id, slots)
+
+    def hoist(self, node, variant, loop_id, slots):
+
+        """
+        Replace the maximal invariant expressions of a subtree with invariantNodes
+        :return: rewritten subtree, True if the whole subtree is an invariant expression
+        """
+
+        if node.value in FUNCTIONS:
+            return node, False # nested functions have their own scopes
+        if node.value in ('termNode', 'invariantNode'):
+            return node, True
+        if node.value == 'IDNode':
+            return node, node.leaf not in variant
+
+        children = [self.hoist(child, variant, loop_id, slots) for child in node.children]
+        invariant = node.value in PURE and all(flag for _, flag in children)
+
+        if invariant:
+            children = [child for child, _ in children]
+        else:
+            children = [self.wrap(child, flag, loop_id, slots) for child, flag in children]
+
+        return ASTNode(node.value, children, node.leaf, node.line), invariant
+
+    @staticmethod
+    def wrap(node, invariant, loop_id, slots):
+        # Only expressions with operators are worth hoisting
+        if not invariant or node.value not in PURE:
+            return node
+        slots.append(node)
+        return ASTNode('invariantNode', [node], leaf=(loop_id, len(slots) - 1), line=node.line)
+
+    def reduce(self, node, identifier, loop_id, slots, inductions):
+
+        """
+        Replace 'identifier * constant' (and 'constant * identifier') with inductionNodes
+        :return: rewritten subtree
+        """
+
+        if node.value in FUNCTIONS:
+            return node
+
+        if node.value == '*' and len(node.children) == 2:
+            left, right = node.children
+            if right.value == 'IDNode' and right.leaf == identifier:
+                left, right = right, left
+            if left.value == 'IDNode' and left.leaf == identifier \
+                    and right.value == 'termNode' and type(right.leaf) is int:
+                slots.append(node)
+                inductions.append((len(slots) - 1, right.leaf))
+                return ASTNode('inductionNode', leaf=(loop_id, len(slots) - 1), line=node.line)
+
+        children = [self.reduce(child, identifier, loop_id, slots, inductions) for child in node.children]
+        return ASTNode(node.value, children, node.leaf, node.line)
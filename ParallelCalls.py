@@ -0,0 +1,216 @@
+# Parallel calls: sibling calls of an expression (operands of the same operators, arguments of the same call)
+# that run pure and expensive functions are started together in a process pool.
+#
+# A top-level function is pure if
+# - its parameters and its return value are Int, String or Boolean (values are copied to the workers)
+# - its body never prints, reads the input or assigns an element of an IntArray
+# - it neither assigns nor reads the top-level variables (except the 'val' ones initialized with a constant)
+# - every top-level function it may call is pure
+# It is expensive if it contains a loop or it's recursive (also through other functions),
+# or if it may call an expensive function.
+#
+# The calls of a group are evaluated as without this pass, from left to right: the longest prefix of
+# pure calls is only started earlier, in the pool, and each result (or error) is taken when its call is reached.
+# Arguments of the grouped calls contain no calls, so starting a call earlier can't change
+# what the program prints or reads, and the first error raised is still the same one.
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from Interpreter import *
+from Optimizer import OPERATORS, LOOPS, FUNCTIONS, walk, assigned_names
+from Reachability import Function, own_nodes
+
+# Types of the values that can be passed to (and returned by) a call running in the pool
+VALUES = ('Int', 'String', 'Boolean')
+
+# Nodes of the arguments of a grouped call: they can be evaluated earlier without side effects
+SIMPLE = OPERATORS + ('termNode', 'IDNode', 'arrayAccessNode', 'arraySizeNode', 'invariantNode', 'inductionNode')
+
+def operand_calls(node):
+    # Calls reached from an expression through its operators only
+    if node.value == 'functionCallNode':
+        return [node]
+    if node.value in OPERATORS:
+        return [call for child in node.children for call in operand_calls(child)]
+    return []
+
+def called_names(node):
+    return {n.children[0].leaf for n in walk(node) if n.value == 'functionCallNode'}
+
+def reachable(function, callees):
+    # Functions that may be called, directly or not, by a function (callees: function -> functions it may call)
+    found = set()
+    stack = [function]
+    while stack:
+        for callee in callees.get(stack.pop(), ()):
+            if callee not in found:
+                found.add(callee)
+                stack.append(callee)
+    return found
+
+# Worker state: an interpreter whose root scope holds the top-level declarations of the program
+worker = None
+worker_root = None
+
+def init_worker(tree, int32):
+    global worker, worker_root
+    worker = Interpreter(int32=int32)
+    worker.initialize(tree)
+    worker_root = worker.s
+
+def call_pure(name, values, line):
+    # Errors are pickled back to the caller with their type and message
+    call = ASTNode('functionCallNode', [ASTNode('IDNode', leaf=name),
+                                        ASTNode('parametersNode', [ASTNode('termNode', leaf=value)
+                                                                   for value in values])], line=line)
+    worker.s = SymbolTable(worker_root, 'function') # calls are evaluated inside a function
+    return worker.evaluate(call)
+
+class ParallelCalls:
+    def __init__(self, workers=None):
+
+        """
+        Rewrite a program to start its independent pure calls in a process pool
+        :param workers: processes of the pool (os.cpu_count() if None)
+        """
+
+        self.workers = workers or os.cpu_count() or 1
+        self.pure = set() # (name, parameters) of the pure top-level functions
+        self.expensive = set() # (name, parameters) of the pure and expensive top-level functions
+        self.names = set() # names of the pure and expensive top-level functions
+        self.groups = [] # group id -> grouped calls, in evaluation order
+        self.tree = None
+        self.executor = None
+        self.lock = threading.Lock() # runs of the same program from several threads share the pool
+
+    def prepare(self, tree):
+
+        """
+        Group the sibling calls of pure and expensive functions
+        :param tree: scriptNode (it is not modified)
+        :return: rewritten copy of the tree
+        """
+
+        self.analyze(tree.children[0])
+        self.tree = self.visit(tree)
+        return self.tree
+
+    def analyze(self, script):
+
+        top_level = [Function(node, None) for node in script.children if node.value in FUNCTIONS]
+        overloads = {}
+        for function in top_level:
+            overloads.setdefault(function.name, []).append(function)
+
+        # Top-level variables a worker can read: its root scope is the one reached after the declarations
+        variables = set()
+        constants = set()
+        for node in own_nodes(script):
+            if node.value == 'variableDeclarationNode':
+                variables.add(node.children[1].leaf)
+                if node.children[0].leaf == 'val' and node.children[-1].value == 'termNode':
+                    constants.add(node.children[1].leaf)
+
+        pure = set()
+        for function in top_level:
+            body = function.node.children[-1]
+            nodes = list(walk(body))
+            if set(function.types) <= set(VALUES) and function.returnType in VALUES \
+                    and not any(n.value in ('printlnNode', 'readLineNode', 'indexAssignmentNode') for n in nodes) \
+                    and not assigned_names(body) & variables \
+                    and not {n.leaf for n in nodes if n.value == 'IDNode'} & (variables - constants):
+                pure.add(function)
+
+        # A function calling an impure one (any overload with the called name) is impure
+        changed = True
+        while changed:
+            changed = False
+            for function in list(pure):
+                callees = [f for name in called_names(function.node) for f in overloads.get(name, [])]
+                if not all(callee in pure for callee in callees):
+                    pure.discard(function)
+                    changed = True
+
+        # Loops and recursion (direct or mutual: f -> g -> f) make a call expensive, also through the called functions
+        callees = {f: [callee for name in called_names(f.node) for callee in overloads.get(name, [])] for f in pure}
+        expensive = {f for f in pure if any(n.value in LOOPS for n in walk(f.node)) or f in reachable(f, callees)}
+        changed = True
+        while changed:
+            changed = False
+            for function in pure - expensive:
+                if any(callee in expensive for callee in callees[function]):
+                    expensive.add(function)
+                    changed = True
+
+        self.pure = {(f.name, f.parameters) for f in pure}
+        self.expensive = {(f.name, f.parameters) for f in expensive}
+        self.names = {f.name for f in expensive}
+
+    def visit(self, node):
+        if node.value in OPERATORS or node.value == 'parametersNode':
+            members = [call for child in node.children for call in operand_calls(child)] \
+                if node.value == 'parametersNode' else operand_calls(node)
+            if self.groupable(node, members):
+                return self.group(node, members)
+        return ASTNode(node.value, [self.visit(child) for child in node.children], node.leaf, node.line)
+
+    def groupable(self, node, members):
+        # At least two calls that may run in the pool, and no other call in the expression
+        if sum(call.children[0].leaf in self.names for call in members) < 2:
+            return False
+        calls = [n for n in walk(node) if n.value == 'functionCallNode']
+        if len(calls) != len(members):
+            return False
+        return all(n.value in SIMPLE for call in members for argument in call.children[1:]
+                   for child in argument.children for n in walk(child))
+
+    def group(self, node, members):
+        group_id = len(self.groups)
+        positions = {id(call): position for position, call in enumerate(members)}
+
+        def replace(current):
+            if id(current) in positions:
+                return ASTNode('parallelCallNode', [current], leaf=(group_id, positions[id(current)]), line=current.line)
+            return ASTNode(current.value, [replace(child) for child in current.children], current.leaf, current.line)
+
+        expression = replace(node)
+        self.groups.append(members)
+        return ASTNode('parallelGroupNode', [expression], leaf=group_id, line=node.line)
+
+    def start(self, interpreter, group_id):
+
+        """
+        Start the longest prefix of the calls of a group that can run in the pool
+        :return: futures of the started calls
+        """
+
+        started = []
+        for call in self.groups[group_id]:
+            name = call.children[0].leaf
+            try:
+                if not interpreter.s.check_father():
+                    break
+                arguments = interpreter.evaluate(call.children[1]) if len(call.children) > 1 else ()
+                if not interpreter.s.is_function_declared(name, arguments):
+                    break
+                function, parameters = interpreter.s.get_function(name, arguments)
+            except Exception:
+                break # the error is raised again when the call is evaluated in its turn
+            if function['scope'].parent is not None or (name, parameters) not in self.expensive:
+                break # nested or impure function: it may depend on the calls before it
+            with self.lock:
+                if self.executor is None:
+                    self.executor = ProcessPoolExecutor(self.workers, initializer=init_worker,
+                                                        initargs=(self.tree, interpreter.int32))
+                executor = self.executor
+            started.append(executor.submit(call_pure, name, tuple(value for value, _ in arguments), call.line))
+        return started
+
+    def close(self):
+        # Stop the worker processes
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
@@ -0,0 +1,108 @@
+# Parallel parsing of huge sources: the token stream is split at the top-level declarations (brace depth 0),
+# each chunk of declarations is parsed in a separate process and the resulting subtrees are
+# stitched together into one scriptNode/statementsNode.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from Parser import *
+from Lexer import *
+
+# Tokens that can start a top-level declaration
+DECLARATIONS = ('FUN', 'VAL', 'VAR')
+
+# Below this number of top-level declarations a single LALR pass is faster than starting a pool
+MIN_DECLARATIONS = 256
+
+def split_declarations(source):
+
+    """
+    Pre-scan the token stream looking for top-level declaration boundaries
+    :param source: Kotlin source code
+    :return: list of (position, line) where each top-level declaration starts
+    """
+
+    scan_lexer = build_lexer()
+    scan_lexer.lexerrorf = skip_error # illegal characters are reported once, by the process that parses the chunk
+    scan_lexer.input(source)
+
+    boundaries = []
+    depth = 0
+    for tok in iter(scan_lexer.token, None):
+        if tok.type == 'LBRACE':
+            depth += 1
+        elif tok.type == 'RBRACE':
+            depth -= 1
+        elif depth == 0 and (tok.type in DECLARATIONS or not boundaries):
+            boundaries.append((tok.lexpos, tok.lineno))
+
+    return boundaries
+
+def parse_chunk(chunk):
+
+    """
+    Parse a chunk of top-level declarations (executed in a worker process)
+    :param chunk: (source of the chunk, line number of its first token)
+    :return: the statements of the chunk and the messages of its illegal characters,
+    None if the chunk has a syntax error (its recovery could differ from the one of the whole source)
+    """
+
+    text, line = chunk
+    errors = []
+    messages = []
+
+    def illegal_character(t):
+        t.lexer.skip(1)
+        messages.append(f"Illegal character '{t.value[0]}' at line {t.lexer.lineno}")
+
+    chunk_lexer = build_lexer()
+    chunk_lexer.lexerrorf = illegal_character # reported by the main process, unless the source is parsed again
+    chunk_lexer.lineno = line # line numbers refer to the whole source
+    chunk_lexer.input(text)
+    chunk_parser = build_parser()
+    chunk_parser.errorfunc = errors.append
+    tree = chunk_parser.parse(lexer=chunk_lexer)
+
+    if errors:
+        return None
+    return (tree.children[0].children if tree is not None else []), messages
+
+def parse_parallel(source, workers=None):
+
+    """
+    Parse a source program splitting its top-level declarations among a pool of processes
+    :param source: Kotlin source code
+    :param workers: number of processes (os.cpu_count() if None)
+    :return: scriptNode (None if the program is empty)
+    """
+
+    workers = workers or os.cpu_count() or 1
+    boundaries = split_declarations(source)
+
+    if workers == 1 or len(boundaries) < MIN_DECLARATIONS:
+        return parse(source)
+
+    # Group consecutive declarations in chunks of similar size (a few chunks per process to balance the load)
+    size = max(1, len(boundaries) // (workers * 4))
+    starts = boundaries[::size]
+    chunks = []
+    for i, (position, line) in enumerate(starts):
+        end = starts[i + 1][0] if i + 1 < len(starts) else len(source)
+        chunks.append((source[position:end], line))
+
+    with ProcessPoolExecutor(workers) as pool:
+        results = list(pool.map(parse_chunk, chunks))
+
+    # With a syntax error the whole source is parsed again, so errors are reported and recovered from as by parse()
+    if any(result is None for result in results):
+        return parse(source)
+
+    statements = []
+    for children, messages in results:
+        for message in messages:
+            print(message)
+        statements.extend(children)
+
+    if not statements:
+        return None
+    return ASTNode("scriptNode", [ASTNode("statementsNode", statements)])
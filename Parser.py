@@ -1,6 +1,8 @@
 # A parser takes a sequence of tokens (produced by the lexer) and produces an abstract syntax tree (AST)
 # of the Kotlin language's restriction.
 
+import copy
+
 import ply.yacc as yacc
 from Lexer import *        # Required Tokens' map from the lexer
 from ASTNode import *
@@ -38,6 +40,7 @@ def p_statements(p):
 def p_statement(p):
     """statement : declaration semis
                  | assignment semis
+                 | indexAssignment semis
                  | forStatement semis
                  | whileStatement semis
                  | ifExpression semis
@@ -66,6 +69,10 @@ def p_assignment(p):
     """assignment : termID ASSIGN expression """
     p[0] = ASTNode('assignmentNode', [p[1], p[3]], line=p.lineno(1))
 
+def p_indexAssignment(p):
+    """indexAssignment : termID LBRACKET expression RBRACKET ASSIGN expression """
+    p[0] = ASTNode('indexAssignmentNode', [p[1], p[3], p[6]], line=p[1].line)
+
 def p_functionDeclaration(p):
     """functionDeclaration : FUN termID LPAREN RPAREN block
                            | FUN termID LPAREN functionValueParameters RPAREN block
@@ -99,10 +106,17 @@ def p_block_return(p):
     else:
         p[0] = p[2]
 
+def p_lazy_body(p):
+    # body of a function declaration that will be parsed on the first call (see lazy_tokens)
+    """block : LAZYBODY
+       block_return : LAZYBODY"""
+    p[0] = ASTNode('lazyBodyNode', leaf=p[1])
+
 def p_typeParameter(p):
     """typeParameter : INT
                      | STRING
-                     | BOOLEAN"""
+                     | BOOLEAN
+                     | INTARRAY"""
     p[0] = ASTNode('typeParameterNode', leaf=p[1])
 
 def p_expression(p):
@@ -194,12 +208,27 @@ def p_term(p):
             | TRUE
             | FALSE
             | functionCall
+            | intArray
+            | arrayAccess
+            | arraySize
             | termID"""
     if isinstance(p[1], ASTNode):
         p[0] = p[1]
     else:
         p[0] = ASTNode('termNode', leaf=p[1])
 
+def p_intArray(p):
+    """intArray : INTARRAY LPAREN expression RPAREN"""
+    p[0] = ASTNode('intArrayNode', [p[3]], line=p.lineno(1))
+
+def p_arrayAccess(p):
+    """arrayAccess : termID LBRACKET expression RBRACKET"""
+    p[0] = ASTNode('arrayAccessNode', [p[1], p[3]], line=p[1].line)
+
+def p_arraySize(p):
+    """arraySize : termID DOT ID"""
+    p[0] = ASTNode('arraySizeNode', [p[1]], leaf=p[3], line=p[1].line)
+
 def p_println(p):
     """println : PRINTLN LPAREN expression RPAREN"""
     p[0] = ASTNode('printlnNode', [p[3]], line=p.lineno(1))
@@ -227,15 +256,18 @@ def p_comment(p): # for comments
     pass
 
 def p_error(p):
+    syntax_error(p, parser)
+
+def syntax_error(p, active_parser):
     if p:
         print(f"Syntax error at '{p.value}' (line {p.lineno})")
 
         # Read ahead looking for a closing "}"
         while True:
-            tok = parser.token()  # Get the next token
+            tok = active_parser.token()  # Get the next token
             if not tok or tok.type == 'RBRACE':
                 break
-        parser.restart() # discards the entire parsing stack and resets the parser to its initial state
+        active_parser.restart() # discards the entire parsing stack and resets the parser to its initial state
 
     else:
         print("Syntax error at EOF")
@@ -243,3 +275,135 @@ def p_error(p):
 # Build the parser:
 parser = yacc.yacc(debug=True, write_tables=True)
 
+def build_parser():
+    # Independent parser: parsing tables are shared (read-only), parsing state and error recovery are not
+    new_parser = copy.copy(parser)
+    new_parser.errorfunc = lambda p: syntax_error(p, new_parser)
+    return new_parser
+
+def parse(source, lazy=False, validate=False):
+
+    """
+    Parse a source program with a new lexer and a new parser: it can be called concurrently from many threads
+    :param source: Kotlin source code
+    :param lazy: function bodies are parsed on their first call (lazyBodyNode, see LazyBody)
+    :param validate: with lazy, parse all the bodies anyway so that syntax errors are reported now
+    :return: scriptNode (None if the program is empty)
+
+    With validate it raises a SyntaxError if the body of a function is not valid
+    """
+
+    new_lexer = build_lexer()
+    new_lexer.input(source)
+    if not lazy:
+        return build_parser().parse(lexer=new_lexer)
+
+    bodies = []
+    tokens = lazy_tokens(new_lexer, source, bodies=bodies)
+    tree = build_parser().parse(lexer=new_lexer, tokenfunc=lambda: next(tokens, None))
+    if validate:
+        validate_bodies(bodies)
+    return tree
+
+class LazyBody:
+    # Source of a function declaration whose body has not been parsed yet
+
+    def __init__(self, text, line):
+        self.text = text # from 'fun' to the closing '}' of the body
+        self.line = line # line of 'fun'
+        self.declaration = None # parsed functionDeclarationNode (or mainNode), set by the first parse()
+
+    def parse(self):
+
+        """
+        Parse the declaration (once): nested function declarations are lazy in turn
+        :return: functionDeclarationNode (or mainNode)
+
+        It raises a SyntaxError if the body is not valid
+        """
+
+        if self.declaration is None:
+            errors = []
+            body_lexer = build_lexer()
+            body_lexer.lexerrorf = skip_error # illegal characters were reported when the whole source was lexed
+            body_lexer.lineno = self.line
+            body_lexer.input(self.text)
+            tokens = lazy_tokens(body_lexer, self.text, eager=1)
+            body_parser = build_parser()
+            body_parser.errorfunc = errors.append
+            tree = body_parser.parse(lexer=body_lexer, tokenfunc=lambda: next(tokens, None))
+
+            if errors:
+                if errors[0] is None:
+                    raise SyntaxError("Syntax error at EOF")
+                raise SyntaxError(f"Syntax error at '{errors[0].value}' (line {errors[0].lineno})")
+            self.declaration = tree.children[0].children[0].freeze()
+
+        return self.declaration
+
+    # The text identifies the body (e.g. in Profile.tree_hash)
+    def __repr__(self):
+        return f"LazyBody({self.text!r}, {self.line})"
+
+    def __str__(self):
+        return f"lazy body ({len(self.text)} characters)"
+
+def lazy_tokens(token_lexer, source, eager=0, bodies=None):
+
+    """
+    Token stream where the body of each function declaration, brace-matched, is replaced by one LAZYBODY token
+    :param token_lexer: lexer with its input already set
+    :param source: input of the lexer (the text of the declarations is sliced from it)
+    :param eager: number of leading function declarations whose bodies are not replaced
+    :param bodies: list where the LazyBody of each replaced body is appended
+    """
+
+    tokens = iter(token_lexer.token, None)
+    for tok in tokens:
+        yield tok
+        if tok.type != 'FUN':
+            continue
+        if eager:
+            eager -= 1
+            continue
+
+        # signature: everything up to the first '{' (parameters can't contain braces)
+        fun = tok
+        pending = []
+        depth = 0
+        for body_tok in tokens:
+            pending.append(body_tok)
+            if body_tok.type == 'LBRACE':
+                depth += 1
+            elif body_tok.type == 'RBRACE':
+                depth -= 1
+                if depth == 0:
+                    break
+            elif depth == 0 and body_tok.type == 'FUN':
+                break # malformed signature: let the parser report it
+
+        if not pending or pending[-1].type != 'RBRACE' or depth != 0:
+            yield from pending # unbalanced braces: the parser reports the error
+            continue
+
+        start = next(i for i, body_tok in enumerate(pending) if body_tok.type == 'LBRACE')
+        yield from pending[:start]
+
+        lazy = copy.copy(pending[start])
+        lazy.type = 'LAZYBODY'
+        lazy.value = LazyBody(source[fun.lexpos:pending[-1].lexpos + 1], fun.lineno)
+        if bodies is not None:
+            bodies.append(lazy.value)
+        yield lazy
+
+def validate_bodies(bodies):
+    # Parse the lazy bodies (also the nested ones), raising a SyntaxError for the first invalid one
+    for body in bodies:
+        nested = []
+        stack = [body.parse()]
+        while stack:
+            node = stack.pop()
+            if node.value == 'lazyBodyNode':
+                nested.append(node.leaf)
+            stack.extend(reversed(node.children))
+        validate_bodies(nested)
@@ -0,0 +1,129 @@
+# A prepared program is parsed and validated once, then it can be executed many times
+# (also from multiple threads): each run gets a fresh Interpreter, so no state is shared between runs.
+
+from Interpreter import *
+from Parser import *
+from Lexer import *
+from Optimizer import Optimizer
+from Reachability import Reachability
+from Profile import ProfilingInterpreter, SpecializedInterpreter
+from Snapshot import Snapshot
+from Transpiler import Transpiler, NotTranspilable
+from ParallelCalls import ParallelCalls
+from MemoryProfile import MemoryProfilingInterpreter
+from Closures import captured_names
+
+class PreparedProgram:
+    def __init__(self, source, optimize=False, prune=False, transpile=False, transpiler=None, lazy=False,
+                 validate=False, parallel=False, workers=None, int32=False, trim=False):
+
+        """
+        Parse and validate a Kotlin source program
+        :param source: Kotlin source code
+        :param optimize: apply the loop optimizer (see Optimizer.py)
+        :param prune: remove the functions that can't be reached from main() (see Reachability.py),
+        the removed ones are listed in self.removed as (name, parameters, line)
+        :param transpile: compile the program to Python (see Transpiler.py), programs that can't be compiled
+        run on the interpreter
+        :param transpiler: Transpiler whose cache is used (a new one if None)
+        :param lazy: parse function bodies on their first call (see Parser.parse); optimize, prune, transpile
+        and parallel need the whole tree, so with them the bodies are parsed immediately
+        :param validate: with lazy, report the syntax errors of all the bodies now (as a SyntaxError)
+        :param parallel: start the sibling calls of pure and expensive functions together in a process pool
+        (see ParallelCalls.py), call close() to stop its processes
+        :param workers: processes of the pool (one per CPU if None)
+        :param int32: Int values are 32-bit and wrap around on overflow, as in Kotlin (see Interpreter);
+        compiled programs use Python integers, so with int32 the program always runs on the interpreter
+        :param trim: nested functions capture a flat scope with only the names they reference (see Closures.py):
+        it saves memory when many nested functions outlive their scopes, it costs some when they don't
+
+        It raises an Exception if the program has no main function (or more than one)
+        """
+
+        tree = parse(source, lazy and not (optimize or prune or transpile or parallel), validate)
+
+        if tree is None:
+            raise SyntaxError("Empty program or syntax error: can't run code")
+
+        Interpreter.check_main(tree)
+        self.removed = []
+        if prune:
+            reachability = Reachability()
+            tree = reachability.prune(tree)
+            self.removed = reachability.removed
+        self.code = None # compiled program (None: it runs on the interpreter)
+        self.int32 = int32
+        if transpile and not int32:
+            try:
+                self.code = (transpiler or Transpiler()).compile(tree)
+            except NotTranspilable:
+                pass
+        if optimize:
+            tree = Optimizer().optimize(tree)
+        self.calls = None
+        if parallel:
+            self.calls = ParallelCalls(workers)
+            tree = self.calls.prepare(tree)
+        self.tree = tree.freeze()
+        self.captures = captured_names(self.tree) if trim else {} # read-only, shared by the interpreters of the runs
+
+    def run(self, stdin=None, stdout=None, profile=None):
+
+        """
+        Execute the program with a fresh interpreter state
+        :param stdin: stream read by readLine() (standard input if None)
+        :param stdout: stream written by println() (standard output if None)
+        :param profile: Profile of previous runs used to specialize this run (see Profile.py)
+        :return: value returned by main()
+        """
+
+        if profile is None and self.code is not None:
+            return Transpiler.run(self.code, stdin, stdout)
+        if profile is None:
+            interpreter = Interpreter(stdin, stdout, self.int32)
+            interpreter.calls = self.calls
+            interpreter.captures = self.captures
+            return interpreter.evaluate(self.tree)
+        interpreter = SpecializedInterpreter(self.tree, profile, stdin, stdout, self.int32)
+        interpreter.captures = self.captures
+        return interpreter.evaluate(self.tree)
+
+    def close(self):
+        # Stop the processes started for the parallel calls
+        if self.calls is not None:
+            self.calls.close()
+
+    def record_profile(self, stdin=None, stdout=None, profile=None):
+
+        """
+        Execute the program recording a profile
+        :param profile: profile of previous runs, the new observations are added to it
+        :return: recorded Profile (save it with Profile.save(profile_path(script)))
+        """
+
+        interpreter = ProfilingInterpreter(self.tree, profile, stdin, stdout, self.int32)
+        interpreter.captures = self.captures
+        interpreter.evaluate(self.tree)
+        return interpreter.profile
+
+    def record_memory_profile(self, stdin=None, stdout=None, interval=1000):
+
+        """
+        Execute the program tracing its allocations (see MemoryProfile.py)
+        :param interval: evaluated nodes between two samples of the peak timeline
+        :return: MemoryProfile (MemoryProfile.report() lists the top consumers)
+        """
+
+        interpreter = MemoryProfilingInterpreter(self.tree, stdin, stdout, self.int32, interval)
+        interpreter.captures = self.captures
+        interpreter.run(self.tree)
+        return interpreter.profile
+
+    def snapshot(self):
+
+        """
+        Evaluate the top-level declarations once and capture the resulting state
+        :return: Snapshot that can be saved to a file and forked to start at main() immediately
+        """
+
+        return Snapshot.capture(self.tree, self.int32, self.captures)
@@ -0,0 +1,216 @@
+# Profile-guided specialization.
+# A profiling run records, for every node of the AST, how many times it is evaluated and the types of its values
+# (operands of the operators, arguments of the calls), the overloads chosen by the calls,
+# how many times the conditions are true (branch bias) and so the trip counts of the loops.
+# The profile is saved next to the script and a later run uses it to pre-resolve overloads and
+# to specialize the operator nodes for the observed types before their first evaluation
+# (see Interpreter.specialize: if the observations turn out to be wrong, the node goes back to the generic path).
+
+import hashlib
+import json
+
+from Interpreter import *
+
+PROFILE_VERSION = 2
+
+def profile_path(script_path):
+    # The profile of a script is saved next to it
+    return script_path + '.profile'
+
+def number_nodes(tree):
+    # Nodes of the tree in pre-order: the position of a node identifies it across runs
+    nodes = []
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        stack.extend(reversed(node.children))
+    return nodes
+
+def tree_hash(nodes):
+    # A profile can only be used with the tree it was recorded on
+    # (the number of children makes the pre-order sequence identify the shape of the tree)
+    digest = hashlib.sha256()
+    for node in nodes:
+        digest.update(f"{node.value}|{node.leaf!r}|{node.line}|{len(node.children)}\n".encode())
+    return digest.hexdigest()
+
+def signature(arguments):
+    # Types of the evaluated arguments of a call: (value, type) pairs
+    return ','.join(arg_type for _, arg_type in arguments)
+
+class Profile:
+    def __init__(self, tree_hash, nodes=None):
+        self.tree_hash = tree_hash
+        self.nodes = nodes or {} # position of the node -> observations
+
+    @classmethod
+    def load(cls, path):
+
+        """
+        Read a profile from a file
+        :param path: path of the profile (see profile_path)
+        """
+
+        with open(path, 'r') as file:
+            data = json.load(file)
+        if data.get('version') != PROFILE_VERSION:
+            raise ValueError(f"Profile '{path}' was written by an incompatible interpreter version")
+        return cls(data['tree'], data['nodes'])
+
+    def save(self, path):
+
+        """
+        Write the profile to a file
+        :param path: path of the profile (see profile_path)
+        """
+
+        with open(path, 'w') as file:
+            json.dump({'version': PROFILE_VERSION, 'tree': self.tree_hash, 'nodes': self.nodes}, file)
+
+    def entry(self, index, node):
+        return self.nodes.setdefault(str(index), {'node': node.value, 'count': 0, 'true': 0, 'types': {}})
+
+    def observe(self, index, node, value):
+        entry = self.entry(index, node)
+        entry['count'] += 1
+        if value is True:
+            entry['true'] += 1
+        kind = signature(value) if node.value == 'parametersNode' else getType(value)
+        entry['types'][kind] = entry['types'].get(kind, 0) + 1
+
+    def observe_overload(self, index, node, parameters):
+        entry = self.entry(index, node)
+        key = ','.join(f"{name}:{param_type}" for name, param_type in parameters)
+        overloads = entry.setdefault('overloads', {})
+        overloads[key] = overloads.get(key, 0) + 1
+
+    def observed_type(self, index):
+        # The only type observed for a node (None if the node is polymorphic or was never evaluated)
+        entry = self.nodes.get(str(index))
+        if entry is None or len(entry['types']) != 1:
+            return None
+        return next(iter(entry['types']))
+
+    def report(self, tree, top=10):
+
+        """
+        Describe the hottest nodes, the branch bias of the conditions and the trip counts of the loops
+        :param tree: tree the profile was recorded on
+        :param top: number of hottest nodes
+        :return: lines of the report
+        """
+
+        nodes = number_nodes(tree)
+        index = {node: i for i, node in enumerate(nodes)}
+        lines = []
+
+        hottest = sorted(self.nodes.items(), key=lambda item: -item[1]['count'])[:top]
+        for position, entry in hottest:
+            node = nodes[int(position)]
+            lines.append(f"{entry['node']} (line {node.line}): {entry['count']} times, types {entry['types']}")
+
+        for node in nodes:
+            entry = self.nodes.get(str(index[node]))
+            if entry is None:
+                continue
+            if node.value in ('if_expressionNode', 'if_else_expressionNode', 'whileStatementNode'):
+                condition = self.nodes.get(str(index[node.children[0]]))
+                if condition and condition['count']:
+                    lines.append(f"{node.value} (line {node.line}): condition true "
+                                 f"{100 * condition['true'] // condition['count']}% of {condition['count']} times")
+            if node.value in ('whileStatementNode', 'forStatementNode'):
+                body = self.nodes.get(str(index[node.children[-1]]))
+                trips = body['count'] if body else 0
+                lines.append(f"{node.value} (line {node.line}): {trips / entry['count']:.1f} iterations per entry")
+
+        return lines
+
+class ProfilingInterpreter(Interpreter):
+    def __init__(self, tree, profile=None, stdin=None, stdout=None, int32=False):
+
+        """
+        Interpreter that records a profile while it runs
+        :param tree: tree that will be evaluated
+        :param profile: profile of previous runs on the same tree, the observations are added to it
+        """
+
+        super().__init__(stdin, stdout, int32)
+        nodes = number_nodes(tree)
+        self.index = {node: i for i, node in enumerate(nodes)}
+
+        if profile is None or profile.tree_hash != tree_hash(nodes):
+            profile = Profile(tree_hash(nodes))
+        self.profile = profile
+
+    def evaluate(self, node):
+        value = super().evaluate(node)
+        index = self.index.get(node)
+        if index is not None: # the (fake) call to main() is not part of the tree
+            self.profile.observe(index, node, value)
+        return value
+
+    def resolve_function(self, node, name, arguments):
+        function = super().resolve_function(node, name, arguments)
+        index = self.index.get(node)
+        if index is not None:
+            self.profile.observe_overload(index, node, function[1])
+        return function
+
+class SpecializedInterpreter(Interpreter):
+    def __init__(self, tree, profile, stdin=None, stdout=None, int32=False):
+
+        """
+        Interpreter specialized by the profile of previous runs
+        :param tree: tree that will be evaluated
+        :param profile: profile recorded on the same tree (it is ignored if the tree has changed)
+        """
+
+        super().__init__(stdin, stdout, int32)
+        self.overloads = {} # functionCallNode -> (types of the arguments, parameters of the chosen overload)
+
+        nodes = number_nodes(tree)
+        if profile is None or profile.tree_hash != tree_hash(nodes):
+            return
+
+        index = {node: i for i, node in enumerate(nodes)}
+        for i, node in enumerate(nodes):
+            entry = profile.nodes.get(str(i))
+            if entry is None or entry['node'] != node.value:
+                continue
+
+            if len(node.children) == 2 and node.value in BINARY_OPERATORS:
+                types = (profile.observed_type(index[node.children[0]]), profile.observed_type(index[node.children[1]]))
+                if types == ('Int', 'Int') and node.value in INT_OPERATIONS:
+                    self.specialized[node] = 'Int'
+                elif types[0] == 'Boolean' and types[1] in ('Boolean', None) and node.value in ('&&', '||'):
+                    self.specialized[node] = 'Boolean' # the right operand may never be evaluated
+                elif types[0] == 'String' and node.value == '+':
+                    self.specialized[node] = 'String'
+
+            elif node.value == 'functionCallNode' and len(entry.get('overloads', {})) == 1:
+                if len(node.children) > 1:
+                    types = profile.observed_type(index[node.children[1]])
+                    if types is None:
+                        continue
+                    types = tuple(types.split(','))
+                else:
+                    types = ()
+                parameters = tuple(tuple(parameter.split(':')) for parameter in next(iter(entry['overloads'])).split(',')
+                                   if parameter)
+                self.overloads[node] = (types, parameters)
+
+    def resolve_function(self, node, name, arguments):
+        expected = self.overloads.get(node)
+
+        if expected is not None and tuple(arg_type for _, arg_type in arguments) == expected[0]:
+            key = (name, expected[1])
+            scope = self.s
+            while scope:
+                if key in scope.functions:
+                    return scope.functions[key], expected[1]
+                if any(function_name == name for function_name, _ in scope.functions):
+                    break # another overload of this scope may be chosen: use the generic resolution
+                scope = scope.parent
+
+        return super().resolve_function(node, name, arguments)
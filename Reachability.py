@@ -0,0 +1,181 @@
+# Whole-program reachability analysis: starting from fun main(), it follows the calls to find the functions
+# that can be executed and removes the declarations of all the others (top-level and nested ones).
+#
+# A call reaches the declarations with the same name, the same number of parameters and parameter types
+# matching the types of its arguments. Argument types are inferred statically: when a type can't be inferred
+# the argument matches every type, so a declaration is removed only if no call can ever reach it.
+
+from ASTNode import *
+from Optimizer import FUNCTIONS
+from SymbolTable import getType
+
+ARITHMETIC = ('-', '*', '/')
+BOOLEANS = ('==', '!=', '<', '<=', '>', '>=', '&&', '||', '!')
+
+def own_nodes(node):
+    # Nodes of a function body (or of the script) without entering nested function declarations
+    stack = list(reversed(node.children))
+    while stack:
+        current = stack.pop()
+        yield current
+        if current.value not in FUNCTIONS:
+            stack.extend(reversed(current.children))
+
+class Function:
+    def __init__(self, node, parent):
+        self.node = node
+        self.parent = parent # enclosing Function (None for top-level functions)
+        self.name = node.children[0].leaf
+
+        if node.children[1].value == 'functionValueParametersNode':
+            children = node.children[1].children
+            self.parameters = tuple((children[i].leaf, children[i + 1].leaf) for i in range(0, len(children), 2))
+        else:
+            self.parameters = ()
+        self.types = tuple(param_type for _, param_type in self.parameters)
+
+        if len(node.children) == 3 and node.children[1].value == 'typeParameterNode':
+            self.returnType = node.children[1].leaf
+        elif len(node.children) == 4:
+            self.returnType = node.children[2].leaf
+        else:
+            self.returnType = 'None'
+
+class Reachability:
+    def __init__(self):
+        self.functions = [] # every function declaration of the program
+        self.overloads = {} # function name -> declarations with that name
+        self.script = None
+        self.variables = {} # Function (None for the script) -> {variable name -> declarations' type nodes}
+        self.removed = [] # (name, parameters, line) of the removed declarations
+
+    def prune(self, tree):
+
+        """
+        Remove the function declarations that can't be reached from fun main()
+        :param tree: scriptNode (it is not modified)
+        :return: copy of the tree without the unreachable declarations
+        """
+
+        self.script = tree.children[0] # statementsNode
+        self.collect(self.script, None)
+        for function in self.functions:
+            self.overloads.setdefault(function.name, []).append(function)
+
+        # The script itself (top-level declarations and the call to main()) is the root of the call graph
+        main = [f for f in self.functions if f.node.value == 'mainNode']
+        reachable = set(main)
+        queue = [None] + main
+        while queue:
+            owner = queue.pop()
+            for callee in self.callees(owner):
+                if callee not in reachable:
+                    reachable.add(callee)
+                    queue.append(callee)
+
+        removable = {f.node for f in self.functions if f not in reachable and not self.reports_error(f)}
+        self.removed = [(f.name, f.parameters, f.node.line) for f in self.functions if f.node in removable]
+        return self.copy(tree, removable)
+
+    def collect(self, node, owner):
+        # Register functions and declared variables of a body (recursively for nested functions)
+        variables = self.variables.setdefault(owner, {})
+        if owner is not None:
+            for name, param_type in owner.parameters:
+                variables.setdefault(name, []).append(param_type)
+
+        body = node.children[-1] if owner is not None else node
+        for child in own_nodes(body):
+            if child.value in FUNCTIONS:
+                function = Function(child, owner)
+                self.functions.append(function)
+                self.collect(child, function)
+            elif child.value == 'variableDeclarationNode':
+                # An Int variable also accepts a Boolean value: as without a type, its type is the one of the value
+                if len(child.children) == 4 and child.children[2].leaf != 'Int':
+                    declared = child.children[2].leaf
+                else:
+                    declared = child.children[-1]
+                variables.setdefault(child.children[1].leaf, []).append(declared)
+            elif child.value == 'forStatementNode':
+                variables.setdefault(child.children[0].leaf, []).append('Int')
+
+    def callees(self, owner):
+        # Functions that may be called by the body of a function (or by the script)
+        body = owner.node.children[-1] if owner is not None else self.script
+        for node in own_nodes(body):
+            if node.value == 'functionCallNode':
+                yield from self.candidates(node, owner)
+
+    def candidates(self, call, owner):
+        name = call.children[0].leaf
+        arguments = call.children[1].children if len(call.children) > 1 else []
+        types = [self.infer(argument, owner, set()) for argument in arguments]
+        for function in self.overloads.get(name, []):
+            if len(function.types) == len(types) \
+                    and all(t is None or t == p for t, p in zip(types, function.types)):
+                yield function
+
+    def infer(self, node, owner, resolving):
+
+        """
+        Static type of an expression
+        :param resolving: variables whose type is being inferred (to stop on self-references)
+        :return: type name, None if it can't be inferred
+        """
+
+        if node.value == 'termNode':
+            return getType(node.leaf)
+        if node.value == 'IDNode':
+            return self.variable_type(node.leaf, owner, resolving)
+        if node.value == '+':
+            left = self.infer(node.children[0], owner, resolving)
+            right = self.infer(node.children[1], owner, resolving)
+            if left == 'String':
+                return 'String'
+            if left == right == 'Int':
+                return 'Int'
+            return None
+        if node.value in ARITHMETIC or node.value in ('arrayAccessNode', 'arraySizeNode', 'inductionNode'):
+            return 'Int'
+        if node.value in BOOLEANS:
+            return 'Boolean'
+        if node.value == 'intArrayNode':
+            return 'IntArray'
+        if node.value == 'invariantNode':
+            return self.infer(node.children[0], owner, resolving)
+        if node.value == 'functionCallNode':
+            returnTypes = {f.returnType for f in self.candidates(node, owner)}
+            return returnTypes.pop() if len(returnTypes) == 1 else None
+        return None # readLine() returns a String or null
+
+    def variable_type(self, name, owner, resolving):
+        # All the declarations of a name visible from a function must agree on its type
+        if name in resolving:
+            return None
+        resolving = resolving | {name}
+
+        types = set()
+        scope = owner
+        while True:
+            for declared in self.variables.get(scope, {}).get(name, []):
+                if isinstance(declared, ASTNode):
+                    declared = self.infer(declared, scope, resolving)
+                types.add(declared)
+            if scope is None:
+                break
+            scope = scope.parent
+
+        return types.pop() if len(types) == 1 else None
+
+    def reports_error(self, function):
+        # Declarations that raise an error when they are executed are kept, so the error is still reported
+        names = [name for name, _ in function.parameters]
+        if len(names) != len(set(names)):
+            return True
+        return any(other is not function and other.parent is function.parent and other.types == function.types
+                   for other in self.overloads[function.name])
+
+    def copy(self, node, removable):
+        children = [self.copy(child, removable) for child in node.children if child not in removable]
+        return ASTNode(node.value, children, node.leaf, node.line)
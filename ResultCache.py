@@ -0,0 +1,158 @@
+# Execution result cache: the output of a deterministic program depends only on its source and on its input,
+# so the captured output and the outcome (success or error) of a run can be stored and replayed
+# without evaluating the program again.
+#
+# - programs whose reachable code never calls readLine() are keyed by their source only
+# - the others are keyed by their source and by the whole input they were given
+# - every key also contains the version of the interpreter (a hash of its source files),
+#   so results are never replayed by a different interpreter
+# - entries are JSON files in a directory, evicted in least recently used order
+
+import builtins
+import hashlib
+import io
+import json
+import os
+import sys
+
+from PreparedProgram import PreparedProgram
+from Reachability import Reachability
+from Optimizer import walk
+
+RESULT_CACHE_VERSION = 1
+
+# Modules whose code determines the result of a program (Reachability.py and Optimizer.py also decide
+# whether it reads the input)
+INTERPRETER_MODULES = ('ASTNode.py', 'Lexer.py', 'Parser.py', 'SymbolTable.py', 'Closures.py', 'Optimizer.py',
+                       'Reachability.py', 'Interpreter.py', 'PreparedProgram.py')
+
+def interpreter_version():
+    digest = hashlib.sha256(str(RESULT_CACHE_VERSION).encode())
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for module in INTERPRETER_MODULES:
+        with open(os.path.join(directory, module), 'rb') as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+def reads_input(tree):
+    # True if readLine() can be reached from main() (or from the top-level declarations)
+    return any(node.value == 'readLineNode' for node in walk(Reachability().prune(tree)))
+
+class ResultCache:
+    def __init__(self, directory, max_entries=1000):
+
+        """
+        Cache of the results of the programs
+        :param directory: directory of the entries (it is created if needed)
+        :param max_entries: the least recently used entries are removed above this number
+        """
+
+        self.directory = directory
+        self.max_entries = max_entries
+        self.version = interpreter_version()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, source, input_text=None):
+        digest = hashlib.sha256(f"{self.version}\n".encode())
+        digest.update(hashlib.sha256(source.encode()).digest())
+        if input_text is not None:
+            digest.update(hashlib.sha256(input_text.encode()).digest())
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + '.json')
+
+    def run(self, source, stdin=None, stdout=None):
+
+        """
+        Execute a program, or replay its stored result
+        :param source: Kotlin source code
+        :param stdin: stream read by readLine() (standard input if None): it is read to its end only if the program
+        can call readLine(), then readLine() returns null at the end of the input as with any stream
+        :param stdout: stream written by println() (standard output if None), the output is written
+        when the program ends
+        :return: True if the result was replayed from the cache
+
+        It raises the same errors of PreparedProgram.run (replayed errors have the same type and message).
+        Syntax errors are not cached
+        """
+
+        key = self.key(source)
+        entry = self.load(key)
+        replayed = entry is not None
+
+        if entry is None:
+            program = PreparedProgram(source)
+            if reads_input(program.tree):
+                input_text = (stdin or sys.stdin).read()
+                key = self.key(source, input_text)
+                entry = self.load(key)
+                replayed = entry is not None
+                if entry is None:
+                    entry = self.execute(program, io.StringIO(input_text))
+                    self.store(key, entry)
+            else:
+                # readLine() can't be reached: the input is never read, not even from sys.stdin
+                entry = self.execute(program, io.StringIO(''))
+                self.store(key, entry)
+
+        print(entry['stdout'], end='', file=stdout)
+        if entry['error'] is not None:
+            error_type, message = entry['error']
+            error = getattr(builtins, error_type, None)
+            if not (isinstance(error, type) and issubclass(error, Exception)):
+                error = Exception
+            raise error(message)
+        return replayed
+
+    def execute(self, program, stdin):
+        self.misses += 1
+        output = io.StringIO()
+        try:
+            program.run(stdin, output)
+            error = None
+        except Exception as e:
+            error = (type(e).__name__, str(e))
+        return {'version': self.version, 'stdout': output.getvalue(), 'error': error}
+
+    def load(self, key):
+        try:
+            with open(self.path(key), 'r') as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if entry.get('version') != self.version:
+            return None
+
+        self.hits += 1
+        try:
+            os.utime(self.path(key)) # most recently used
+        except OSError:
+            pass # evicted by another process
+        return entry
+
+    def store(self, key, entry):
+        path = self.path(key)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, 'w') as file:
+            json.dump(entry, file)
+        os.replace(temporary, path)
+        self.evict()
+
+    def evict(self):
+        # Remove the least recently used entries above max_entries
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                try:
+                    entries.append((os.path.getmtime(os.path.join(self.directory, name)), name))
+                except OSError:
+                    pass # removed by another process
+        entries.sort()
+        for _, name in entries[:max(0, len(entries) - self.max_entries)]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
@@ -0,0 +1,85 @@
+# A snapshot stores the interpreter state reached after the top-level initialization of a script
+# (root Symbol Table with its variables and functions, plus the prepared AST),
+# so that later runs can start directly from main().
+
+import pickle
+
+from Interpreter import *
+
+SNAPSHOT_VERSION = 3
+
+class Snapshot:
+    def __init__(self, data):
+        self.data = data # pickled {'version', 'tree', 'root', 'int32', 'captures'}
+
+    @classmethod
+    def capture(cls, tree, int32=False, captures=None):
+
+        """
+        Evaluate the top-level declarations of a script and capture the resulting state
+        :param tree: scriptNode (e.g. PreparedProgram.tree)
+        :param int32: Int values are 32-bit (see Interpreter), also in the forks
+        :param captures: result of Closures.captured_names on the tree if the forks trim the closures
+        (pickled with the tree, so a fork doesn't analyse it again)
+        :return: Snapshot
+        """
+
+        interpreter = Interpreter(int32=int32)
+        interpreter.captures = captures or {}
+        interpreter.initialize(tree)
+        return cls(pickle.dumps({'version': SNAPSHOT_VERSION, 'tree': tree, 'root': interpreter.s, 'int32': int32,
+                                 'captures': interpreter.captures}, protocol=pickle.HIGHEST_PROTOCOL))
+
+    @classmethod
+    def load(cls, path):
+
+        """
+        Read a snapshot from a file.
+        Snapshots are pickles: only load files written by a trusted source.
+        :param path: path of the snapshot file
+        """
+
+        with open(path, 'rb') as file:
+            data = file.read()
+        if pickle.loads(data).get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f"Snapshot '{path}' was written by an incompatible interpreter version")
+        return cls(data)
+
+    def save(self, path):
+
+        """
+        Write the snapshot to a file
+        :param path: path of the snapshot file
+        """
+
+        with open(path, 'wb') as file:
+            file.write(self.data)
+
+    def fork(self, stdin=None, stdout=None):
+
+        """
+        Create an interpreter positioned at the end of the top-level initialization.
+        Every fork gets its own copy of the state, so forks don't affect each other.
+        :param stdin: stream read by readLine() (standard input if None)
+        :param stdout: stream written by println() (standard output if None)
+        :return: Interpreter ready to call run_main()
+        """
+
+        state = pickle.loads(self.data)
+        interpreter = Interpreter(stdin, stdout, state.get('int32', False))
+        interpreter.s = state['root']
+        interpreter.captures = state['captures']
+        return interpreter
+
+    def run(self, stdin=None, stdout=None):
+
+        """
+        Execute main() starting from the snapshot
+        :return: value returned by main()
+        """
+
+        return self.fork(stdin, stdout).run_main()
+
+    @property
+    def tree(self):
+        return pickle.loads(self.data)['tree']
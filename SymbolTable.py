@@ -1,6 +1,26 @@
 # Symbol table for storing variables and functions
+import sys
+from array import array
+
+class VariableRecord:
+    # Compact record of a declared variable: no per-instance dict, one attribute access per field
+    __slots__ = ('var', 'type', 'value')
+
+    def __init__(self, var, var_type, value):
+        self.var = var # True if declared with 'var' (it can be reassigned)
+        self.type = var_type
+        self.value = value
+
+    # Records are pickled by Snapshot
+    def __getstate__(self):
+        return self.var, self.type, self.value
+
+    def __setstate__(self, state):
+        self.var, self.type, self.value = state
 
 class SymbolTable:
+    __slots__ = ('variables', 'functions', 'parent', 'name')
+
     def __init__(self, parent, name):
         self.variables = {}
         self.functions = {}
@@ -22,7 +42,8 @@ class SymbolTable:
 
         if name in self.variables:
             raise Exception(f"Variable '{name}' already declared, line {line}")
-        self.variables[name] = {'declaration': v, 'type': var_type, 'value': value}
+        # type names are interned: all the variables of a type share the same string
+        self.variables[name] = VariableRecord(v == 'var', sys.intern(var_type), value)
 
     def assign_variable(self, name, value):
 
@@ -32,10 +53,13 @@ class SymbolTable:
         :param value: New value of the variable
         """
 
-        if name in self.variables:
-            self.variables[name]['value'] = value
-        elif self.parent:
-            self.parent.assign_variable(name, value)
+        table = self
+        while table:
+            record = table.variables.get(name)
+            if record is not None:
+                record.value = value
+                return
+            table = table.parent
 
     def is_variable_declared(self, name):
 
@@ -45,12 +69,12 @@ class SymbolTable:
         :return: True if the variable is declared
         """
 
-        if name in self.variables:
-            return True
-        elif self.parent:
-            return self.parent.is_variable_declared(name)
-        else:
-            return False
+        table = self
+        while table:
+            if name in table.variables:
+                return True
+            table = table.parent
+        return False
 
     def is_variableVar_declared(self, name):
 
@@ -60,12 +84,13 @@ class SymbolTable:
         :return: True if the variable is declared with 'var'
         """
 
-        if name in self.variables and self.variables[name]['declaration'] == 'var':
-            return True
-        elif self.parent:
-            return self.parent.is_variableVar_declared(name)
-        else:
-            return False
+        table = self
+        while table:
+            record = table.variables.get(name)
+            if record is not None and record.var:
+                return True
+            table = table.parent
+        return False
 
     def get_variable(self, name):
 
@@ -74,10 +99,12 @@ class SymbolTable:
         :param name: Name of the variable to be retrieved
         """
 
-        if name in self.variables:
-            return self.variables[name]['value']
-        elif self.parent:
-            return self.parent.get_variable(name)
+        table = self
+        while table:
+            record = table.variables.get(name)
+            if record is not None:
+                return record.value
+            table = table.parent
 
     def get_variableType(self, name):
 
@@ -86,10 +113,12 @@ class SymbolTable:
         :param name: Name of the variable to be retrieved
         """
 
-        if name in self.variables:
-            return self.variables[name]['type']
-        elif self.parent:
-            return self.parent.get_variableType(name)
+        table = self
+        while table:
+            record = table.variables.get(name)
+            if record is not None:
+                return record.type
+            table = table.parent
 
     def check_father(self):
 
@@ -183,5 +212,7 @@ def getType(term):
         return "Int"
     if str(type(term)) == "<class 'bool'>":
         return "Boolean"
+    if str(type(term)) == "<class 'array.array'>":
+        return "IntArray"
     if str(type(term)) == "<class 'NoneType'>":
         return "None"
\ No newline at end of file
@@ -0,0 +1,31 @@
+val n = 10
+fun fill(a: IntArray, value: Int) {
+    for (i in 0 .. a.size - 1) {
+        a[i] = value * i
+    }
+}
+
+fun sum(a: IntArray): Int {
+    var total = 0
+    for (i in 0 .. a.size - 1) {
+        total = total + a[i]
+    }
+    return total
+}
+
+fun main() {
+    val numbers: IntArray = IntArray(n)
+    println(numbers.size)
+    fill(numbers, 3)
+    println(numbers[9])
+    println(sum(numbers))
+
+    var squares = IntArray(5)
+    var i = 0
+    while (i < squares.size) {
+        squares[i] = i * i
+        i = i + 1
+    }
+    println(squares[4] + squares[3])
+    println(squares[5])
+}
@@ -0,0 +1,194 @@
+# Record and replay of interactive runs.
+# A recorded run stores every value returned by readLine() and every line written by println(),
+# with the time it happened (from the start of the run) and the Kotlin line that did it, plus the outcome.
+# A replay feeds the recorded input back at full speed, checks that the output and the outcome are the same
+# and measures each phase, so interactive scripts can be benchmarked (e.g. with different PreparedProgram options)
+# without waiting for a user.
+
+import hashlib
+import io
+import json
+import time
+
+from Interpreter import *
+from PreparedProgram import PreparedProgram
+
+TRANSCRIPT_VERSION = 1
+
+def source_hash(source):
+    return hashlib.sha256(source.encode()).hexdigest()
+
+class Transcript:
+    def __init__(self, source_hash, events=None, error=None, timings=None):
+        self.source_hash = source_hash
+        self.events = events or [] # [kind ('input' or 'output'), seconds from the start, Kotlin line, text]
+        self.error = error # (type, message) of the error that ended the run, None if it ended normally
+        self.timings = timings or {} # seconds of the phases of the recorded run ('parse', 'run', 'input')
+
+    @classmethod
+    def load(cls, path):
+
+        """
+        Read a transcript from a file
+        :param path: path of the transcript
+        """
+
+        with open(path, 'r') as file:
+            data = json.load(file)
+        if data.get('version') != TRANSCRIPT_VERSION:
+            raise ValueError(f"Transcript '{path}' was written by an incompatible interpreter version")
+        return cls(data['source'], data['events'], data['error'] and tuple(data['error']), data['timings'])
+
+    def save(self, path):
+
+        """
+        Write the transcript to a file
+        :param path: path of the transcript
+        """
+
+        with open(path, 'w') as file:
+            json.dump({'version': TRANSCRIPT_VERSION, 'source': self.source_hash, 'events': self.events,
+                       'error': self.error, 'timings': self.timings}, file, indent=1)
+
+    def inputs(self):
+        # Values returned by readLine(), None at the end of the input
+        return [text for kind, _, _, text in self.events if kind == 'input']
+
+    def outputs(self):
+        # (Kotlin line, text) of the lines written by println()
+        return [(line, text) for kind, _, line, text in self.events if kind == 'output']
+
+class RecordingInterpreter(Interpreter):
+    def __init__(self, stdin=None, stdout=None, int32=False):
+
+        """
+        Interpreter that records the input and the output of the program while it runs
+        """
+
+        super().__init__(stdin, stdout, int32)
+        self.events = []
+        self.waiting = 0.0 # seconds spent in readLine()
+        self.start = time.perf_counter()
+
+    def read_line(self, line=None):
+        before = time.perf_counter()
+        text = super().read_line(line)
+        now = time.perf_counter()
+        self.waiting += now - before
+        self.events.append(['input', now - self.start, line, text])
+        return text
+
+    def write_line(self, value, line=None):
+        super().write_line(value, line)
+        self.events.append(['output', time.perf_counter() - self.start, line, str(value)])
+
+def record(source, stdin=None, stdout=None, **options):
+
+    """
+    Execute a program recording its input and output
+    :param source: Kotlin source code
+    :param stdin: stream read by readLine() (standard input if None)
+    :param stdout: stream written by println() (standard output if None)
+    :param options: options of PreparedProgram (the recorded run is always interpreted)
+    :return: Transcript (save it with Transcript.save), an error of the program is stored in Transcript.error
+
+    Syntax errors are raised as by PreparedProgram
+    """
+
+    start = time.perf_counter()
+    program = PreparedProgram(source, **options)
+    parsed = time.perf_counter()
+
+    interpreter = RecordingInterpreter(stdin, stdout, program.int32)
+    interpreter.captures = program.captures
+    try:
+        interpreter.evaluate(program.tree)
+        error = None
+    except Exception as e:
+        error = (type(e).__name__, str(e))
+    end = time.perf_counter()
+    program.close()
+
+    return Transcript(source_hash(source), interpreter.events, error,
+                      {'parse': parsed - start, 'run': end - parsed, 'input': interpreter.waiting})
+
+class Replay:
+    def __init__(self, transcript, timings, output, error):
+        self.transcript = transcript
+        self.timings = timings # seconds of the phases of the replay ('parse', 'run', 'verify')
+        self.output = output
+        self.error = error
+        self.mismatch = None # description of the first difference from the recorded run
+
+    def verify(self):
+        expected = self.transcript.outputs()
+        lines = self.output.split('\n')[:-1] if self.output else []
+        for index, (line, text) in enumerate(expected):
+            if index >= len(lines):
+                self.mismatch = f"output {index + 1} (line {line}) is missing: expected {text!r}"
+                return
+            if lines[index] != text:
+                self.mismatch = f"output {index + 1} (line {line}) differs: expected {text!r}, got {lines[index]!r}"
+                return
+        if len(lines) > len(expected):
+            self.mismatch = f"output {len(expected) + 1} was not recorded: got {lines[len(expected)]!r}"
+        elif self.error != self.transcript.error:
+            self.mismatch = f"the run ended with {self.error}, recorded {self.transcript.error}"
+
+    @property
+    def matches(self):
+        return self.mismatch is None
+
+    def report(self):
+
+        """
+        Describe the outcome of the replay and the time of its phases, compared with the recorded run
+        :return: lines of the report
+        """
+
+        recorded = self.transcript.timings
+        inputs = len(self.transcript.inputs())
+        outputs = len(self.transcript.outputs())
+        lines = [f"Replay of {inputs} inputs and {outputs} outputs: "
+                 + ("output matches" if self.matches else self.mismatch)]
+        lines.append(f"parse: {1000 * self.timings['parse']:.2f} ms "
+                     f"(recorded {1000 * recorded.get('parse', 0):.2f} ms)")
+        lines.append(f"run: {1000 * self.timings['run']:.2f} ms "
+                     f"(recorded {1000 * recorded.get('run', 0):.2f} ms, "
+                     f"{1000 * recorded.get('input', 0):.2f} ms of them waiting for input)")
+        lines.append(f"verify: {1000 * self.timings['verify']:.2f} ms")
+        return lines
+
+def replay(source, transcript, **options):
+
+    """
+    Execute a program with the recorded input and check its output
+    :param source: Kotlin source code (the one of the recorded run)
+    :param transcript: Transcript of the recorded run
+    :param options: options of PreparedProgram, e.g. to compare the optimizations on the same workload
+    :return: Replay (Replay.matches, Replay.timings, Replay.report())
+
+    It raises a ValueError if the transcript was recorded on a different source
+    """
+
+    if transcript.source_hash != source_hash(source):
+        raise ValueError("The transcript was recorded on a different source")
+
+    stdin = io.StringIO(''.join(text + '\n' for text in transcript.inputs() if text is not None))
+    stdout = io.StringIO()
+
+    start = time.perf_counter()
+    program = PreparedProgram(source, **options)
+    parsed = time.perf_counter()
+    try:
+        program.run(stdin, stdout)
+        error = None
+    except Exception as e:
+        error = (type(e).__name__, str(e))
+    end = time.perf_counter()
+    program.close()
+
+    result = Replay(transcript, {'parse': parsed - start, 'run': end - parsed}, stdout.getvalue(), error)
+    result.verify()
+    result.timings['verify'] = time.perf_counter() - end
+    return result
@@ -0,0 +1,721 @@
+# Kotlin-to-Python backend: the AST is translated into Python source, compiled once and cached (marshalled),
+# so that CPython runs the program instead of Interpreter.evaluate.
+#
+# - Kotlin functions become (nested) Python functions, scopes become Python locals: every declaration gets its
+#   own Python name, so shadowing works as in the Symbol Tables, and nested functions reach the variables of
+#   their enclosing functions as closures
+# - 'for' loops iterate over the same range() computed by the interpreter
+# - operations whose operand types are known statically become plain Python operations,
+#   all the others go through the same checks (and error messages, with line numbers) of the interpreter
+#
+# Names are resolved statically. When the declaration a name refers to depends on the order of execution
+# (e.g. a nested function using a variable declared after it), NotTranspilable is raised and the program
+# has to run on the tree walker.
+
+import hashlib
+import importlib.util
+import marshal
+import os
+
+from Interpreter import *
+from Profile import number_nodes, tree_hash
+from Reachability import Function
+
+TRANSPILER_VERSION = 3
+
+MAX_ITERATIONS = 1000 # same limit of the interpreter's loops
+
+class NotTranspilable(Exception):
+    pass
+
+# Runtime support: each helper raises the same errors of the corresponding branch of Interpreter.evaluate
+
+def declared_value(value, var_type, line):
+    if (var_type == 'Int' and isinstance(value, int)) \
+            or (var_type == 'String' and isinstance(value, str)) \
+            or (var_type == 'Boolean' and isinstance(value, bool)) \
+            or (var_type == 'IntArray' and isinstance(value, array)):
+        return value
+    raise TypeError(f"Wrong variable type, line {line}: expected {var_type}, got {getType(value)}")
+
+def assigned_value(name, value, declared_type, line):
+    if getType(value) != declared_type:
+        raise TypeError(f"Cannot assign value of type {getType(value)} to variable {name} of type {declared_type},"
+                        f" line {line}")
+    return value
+
+def already_declared(name, line, *values):
+    raise Exception(f"Variable '{name}' already declared, line {line}")
+
+def not_declared(name, line):
+    raise ValueError(f"Variable '{name}' not declared, line {line}")
+
+def not_assignable(name, line, *values):
+    raise ValueError(f"Variables not declared or declared with 'val' like "
+                     f"'{name}' cannot be assigned, line {line}")
+
+def not_top_level(line, space=''):
+    raise Exception(f"Excepting a top level declaration, line {line}{space}")
+
+def if_condition(condition, line):
+    if not isinstance(condition, bool):
+        raise TypeError(f"The condition in an 'if' expression must be boolean, got {getType(condition)} instead"
+                        f", line {line}!")
+    return condition
+
+def while_condition(condition, line):
+    if not isinstance(condition, bool):
+        raise TypeError(f"The condition in a 'while' statement must be a boolean, "
+                        f"got {getType(condition)} instead; line {line}")
+    return condition
+
+def too_many_iterations(loop, line):
+    raise RuntimeError(f"Maximum iteration limit exceeded in '{loop}' loop. "
+                       f"Possible infinite loop detected, line {line}")
+
+def for_range(start, end, step, order, line):
+    # step is MISSING when the loop has no 'step'
+    if step is not MISSING:
+        if step < 0:
+            raise ValueError(f"Step must be positive: got {str(step)}, line {line}")
+    else:
+        step = 1
+
+    if step == 0:
+        raise ValueError(f"Step must be different from '0', line {line}")
+
+    if not isinstance(start, int) or not isinstance(end, int) or not isinstance(step, int):
+        raise TypeError(f"All range values must be Integer, "
+                        f"got Start: {getType(start)}, End: {getType(end)}, Step: {getType(step)}"
+                        f", line {line}")
+
+    if start > end:
+        if order == 'downTo':
+            step = -step
+            end -= 1
+    elif start < end:
+        if order == '..':
+            end += 1
+        else:
+            step = -step
+    else:
+        end += 1
+
+    return range(start, end, step)
+
+def negate(operand, line):
+    if not isinstance(operand, int):
+        raise TypeError(f"Operand must be 'Integer', line {line}")
+    return -operand
+
+def logical_not(operand, line):
+    if not isinstance(operand, bool):
+        raise TypeError(f"Cannot evaluate operand {getType(operand)} in a NOT statement, "
+                        f"must be Boolean, line {line}")
+    return not operand
+
+def divide(left, right, line):
+    # both operands are known to be Int
+    if right == 0:
+        raise ZeroDivisionError(f"Division by zero is not allowed, line {line}")
+    return int(left / right)
+
+def parameters_not_unique(line):
+    raise Exception(f"Parameters names must be unique, line {line}")
+
+def function_declared(name, line):
+    raise Exception(f"Function '{name}' already declared, line {line}")
+
+def no_function(name, line, arguments):
+    raise Exception(f"Function '{name}' not declared, line {line}")
+
+def dispatch(name, line, arguments, candidates):
+    # The overload is chosen at runtime when the types of the arguments are not known statically
+    types = tuple(getType(argument) for argument in arguments)
+    for parameters, function in candidates:
+        if parameters == types:
+            return function(*arguments)
+    no_function(name, line, arguments)
+
+def new_array(size, line):
+    if getType(size) != 'Int':
+        raise TypeError(f"IntArray size must be Int, got {getType(size)}, line {line}")
+    if size < 0:
+        raise ValueError(f"IntArray size must be non-negative, got {size}, line {line}")
+    return array('q', bytes(8 * size))
+
+def array_size(elements, name, line):
+    if name != 'size' or not isinstance(elements, array):
+        raise Exception(f"Unresolved reference '{name}' on {getType(elements)}, line {line}")
+    return len(elements)
+
+def array_get(elements, index, line):
+    return elements[Interpreter.check_index(elements, index, line)]
+
+def array_set(elements, index, value, line):
+    if getType(value) != 'Int':
+        raise TypeError(f"Cannot assign value of type {getType(value)} to an element of IntArray, "
+                        f"line {line}")
+    try:
+        elements[index] = value
+    except OverflowError:
+        raise OverflowError(f"Value {value} does not fit in an IntArray element, line {line}")
+
+def operation_node(op, line):
+    return ASTNode(op, line=line)
+
+RUNTIME = {
+    '_declared': declared_value,
+    '_assigned': assigned_value,
+    '_already_declared': already_declared,
+    '_not_declared': not_declared,
+    '_not_assignable': not_assignable,
+    '_not_top_level': not_top_level,
+    '_if': if_condition,
+    '_while': while_condition,
+    '_too_many': too_many_iterations,
+    '_range': for_range,
+    '_missing': MISSING,
+    '_negate': negate,
+    '_not': logical_not,
+    '_divide': divide,
+    '_binary': Interpreter.binary_operation,
+    '_node': operation_node,
+    '_parameters_not_unique': parameters_not_unique,
+    '_function_declared': function_declared,
+    '_no_function': no_function,
+    '_dispatch': dispatch,
+    '_new_array': new_array,
+    '_array_size': array_size,
+    '_array_index': Interpreter.check_index,
+    '_array_get': array_get,
+    '_array_set': array_set,
+    '_getType': getType,
+}
+
+# Translation
+
+class Variable:
+    def __init__(self, name, kind, pyname):
+        self.name = name
+        self.kind = kind # 'var' or 'val'
+        self.pyname = pyname
+        self.declared = None # Python expression of the declared type (used by the assignments)
+        self.static = None # type of the value if it is known statically
+        self.target = None # Python function owning the variable
+
+class Target:
+    # A Python function being generated
+    def __init__(self, parent):
+        self.parent = parent
+        self.lines = []
+        self.nonlocals = set()
+
+class Block:
+    # A Kotlin scope: the declarations of its statements are collected before translating them
+    def __init__(self, translator, parent, target, statements=(), boundary=False, root=False):
+        self.parent = parent
+        self.target = target
+        self.boundary = boundary # parameters of a function: the parent is the scope where the function is declared
+        self.root = root
+        self.position = 0 # statement being translated
+        self.variables = {} # name -> [(position, Variable)]
+        self.functions = {} # name -> [(position, Function)]
+        self.duplicates = set() # positions of the declarations that raise 'already declared'
+        self.deferred = [] # (position, Function) of the top-level functions to define
+
+        for position, statement in enumerate(statements):
+            if statement.value == 'variableDeclarationNode':
+                name = statement.children[1].leaf
+                if name in self.variables:
+                    self.duplicates.add(position)
+                else:
+                    variable = Variable(name, statement.children[0].leaf, translator.pyname('v', name))
+                    self.declare(position, variable)
+            elif statement.value in ('functionDeclarationNode', 'mainNode'):
+                function = Function(statement, None)
+                function.pyname = translator.pyname('f', function.name)
+                if any(other.types == function.types for _, other in self.functions.get(function.name, [])):
+                    self.duplicates.add(position)
+                else:
+                    self.functions.setdefault(function.name, []).append((position, function))
+
+    def declare(self, position, variable):
+        variable.target = self.target
+        self.variables.setdefault(variable.name, []).append((position, variable))
+
+    def visible(self, table, name):
+
+        """
+        Declarations of a name that may be visible from the statement being translated, innermost first
+        :return: (declaration, True if it is certainly visible when the statement runs)
+        """
+
+        block = self
+        crossed = False # inside a function declared in the block
+        while block:
+            for position, declaration in getattr(block, table).get(name, []):
+                if crossed and block.root:
+                    yield declaration, True # top-level declarations are evaluated before main()
+                elif crossed:
+                    yield declaration, position <= block.position # it may be declared after the function
+                elif position < block.position:
+                    yield declaration, True
+            crossed = crossed or block.boundary
+            block = block.parent
+
+class Transpiler:
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir # compiled programs are also marshalled in this directory (None: no disk cache)
+        self.cache = {} # key -> code object
+
+    def compile(self, tree):
+
+        """
+        Translate a program to Python and compile it, or load it from the cache
+        :param tree: scriptNode
+        :return: code object (see run)
+
+        It raises NotTranspilable if the program has to run on the tree walker
+        """
+
+        key = hashlib.sha256(f"{TRANSPILER_VERSION}|{importlib.util.MAGIC_NUMBER.hex()}|"
+                             f"{tree_hash(number_nodes(tree))}".encode()).hexdigest()
+        if key in self.cache:
+            return self.cache[key]
+
+        path = os.path.join(self.cache_dir, key + '.marshal') if self.cache_dir else None
+        if path and os.path.exists(path):
+            with open(path, 'rb') as file:
+                code = marshal.load(file)
+        else:
+            source = self.translate(tree)
+            try:
+                code = compile(source, '<kotlin>', 'exec')
+            except (SyntaxError, RecursionError) as e: # e.g. too many statically nested blocks
+                raise NotTranspilable(f"Python can't compile the translated program: {e}")
+            if path:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(path + '.tmp', 'wb') as file:
+                    marshal.dump(code, file)
+                os.replace(path + '.tmp', path)
+
+        self.cache[key] = code
+        return code
+
+    @staticmethod
+    def run(code, stdin=None, stdout=None):
+
+        """
+        Execute a compiled program with a fresh state
+        :param stdin: stream read by readLine() (standard input if None)
+        :param stdout: stream written by println() (standard output if None)
+        :return: value returned by main()
+        """
+
+        namespace = dict(RUNTIME)
+        namespace['_read_line'] = Interpreter(stdin, stdout).read_line
+        namespace['_stdout'] = stdout
+        exec(code, namespace)
+        return namespace['__result__']
+
+    @staticmethod
+    def translate(tree):
+
+        """
+        Translate a program to Python source
+        :param tree: scriptNode
+        :return: Python source code
+        """
+
+        # The generated names are local to each translation, so a Transpiler can be shared between threads
+        return Translation().translate(tree)
+
+class Translation:
+    def __init__(self):
+        self.names = 0
+        self.constants = []
+
+    def pyname(self, prefix, name):
+        self.names += 1
+        return f"{prefix}_{name}_{self.names}"
+
+    def translate(self, tree):
+        script = Target(None)
+        statements = tree.children[0].children
+        root = Block(self, None, script, statements, root=True)
+        self.statements(statements, root, 1)
+
+        main = [f for _, f in root.functions.get('main', []) if f.types == ()]
+        if main:
+            script.lines.append(f"    return {main[0].pyname}()")
+        else:
+            script.lines.append("    _no_function('main', None, ())")
+
+        return '\n'.join(self.constants + ["def __script__():"] + script.lines + ["__result__ = __script__()", ""])
+
+    def constant(self, op, line):
+        # Operation nodes for the generic checks of Interpreter.binary_operation
+        name = f"_N{len(self.constants)}"
+        self.constants.append(f"{name} = _node({op!r}, {line!r})")
+        return name
+
+    def temporary(self):
+        self.names += 1
+        return f"_t{self.names}"
+
+    # Statements
+
+    def statements(self, statements, block, indent):
+        start = len(block.target.lines)
+        for position, statement in enumerate(statements):
+            block.position = position
+            self.statement(statement, block, indent)
+
+        # Top-level functions are defined after the top-level variables: their bodies may use variables declared
+        # after them, whose types are known only once the declarations have been translated
+        for position, function in block.deferred:
+            block.position = position
+            self.define(function, block, indent)
+
+        if len(block.target.lines) == start:
+            self.emit(block, indent, "pass")
+
+    @staticmethod
+    def emit(block, indent, line):
+        block.target.lines.append("    " * indent + line)
+
+    def block(self, node, parent, indent, variables=()):
+        # Statements of a nested scope ('None' is an empty block)
+        statements = node.children if node.value == 'statementsNode' else []
+        if variables:
+            parent = Block(self, parent, parent.target)
+            parent.position = 1
+            for variable in variables:
+                parent.declare(0, variable)
+        block = Block(self, parent, parent.target, statements)
+        self.statements(statements, block, indent)
+
+    def statement(self, node, block, indent):
+        value = node.value
+
+        if value == 'variableDeclarationNode':
+            self.declaration(node, block, indent)
+
+        elif value in ('functionDeclarationNode', 'mainNode'):
+            function = self.function(node, block, indent)
+            if function is not None and block.root:
+                block.deferred.append((block.position, function))
+            elif function is not None:
+                self.define(function, block, indent)
+
+        elif block.root:
+            # Only declarations can be evaluated outside of a function
+            space = ' ' if value in ('assignmentNode', 'indexAssignmentNode') else ''
+            self.emit(block, indent, f"_not_top_level({node.line!r}, {space!r})")
+
+        elif value == 'assignmentNode':
+            self.assignment(node, block, indent)
+
+        elif value == 'indexAssignmentNode':
+            elements, _ = self.expression(node.children[0], block)
+            index, _ = self.expression(node.children[1], block)
+            assigned, _ = self.expression(node.children[2], block)
+            temporary = self.temporary()
+            self.emit(block, indent, f"{temporary} = {elements}")
+            self.emit(block, indent, f"_array_set({temporary}, _array_index({temporary}, {index}, {node.line!r}), "
+                                     f"{assigned}, {node.line!r})")
+
+        elif value in ('if_expressionNode', 'if_else_expressionNode'):
+            condition, static = self.expression(node.children[0], block)
+            if static != 'Boolean':
+                condition = f"_if({condition}, {node.line!r})"
+            self.emit(block, indent, f"if {condition}:")
+            self.block(node.children[1], block, indent + 1)
+            if value == 'if_else_expressionNode':
+                self.emit(block, indent, "else:")
+                self.block(node.children[2], block, indent + 1)
+
+        elif value == 'whileStatementNode':
+            condition, static = self.expression(node.children[0], block)
+            counter = self.temporary()
+            self.emit(block, indent, f"{counter} = 0")
+            first = condition if static == 'Boolean' else f"_while({condition}, {node.line!r})"
+            # the type of the condition is checked only before the first iteration, as in the interpreter
+            self.emit(block, indent, f"if {first}:")
+            self.emit(block, indent + 1, "while True:")
+            self.block(node.children[1], block, indent + 2)
+            self.emit(block, indent + 2, f"{counter} += 1")
+            self.emit(block, indent + 2, f"if {counter} > {MAX_ITERATIONS}: _too_many('while', {node.line!r})")
+            self.emit(block, indent + 2, f"if not {condition}: break")
+
+        elif value == 'forStatementNode':
+            start, _ = self.expression(node.children[1], block)
+            end, _ = self.expression(node.children[3], block)
+            step = self.expression(node.children[4], block)[0] if len(node.children) == 6 else '_missing'
+            order = node.children[2].leaf
+
+            identifier = Variable(node.children[0].leaf, 'val', self.pyname('v', node.children[0].leaf))
+            identifier.declared = repr('Integer')
+            identifier.static = 'Int'
+
+            counter = self.temporary()
+            self.emit(block, indent, f"{counter} = 0")
+            self.emit(block, indent, f"for {identifier.pyname} in _range({start}, {end}, {step}, {order!r}, "
+                                     f"{node.line!r}):")
+            self.block(node.children[-1], block, indent + 1, [identifier])
+            self.emit(block, indent + 1, f"{counter} += 1")
+            self.emit(block, indent + 1, f"if {counter} > {MAX_ITERATIONS}: _too_many('for', {node.line!r})")
+
+        elif value == 'printlnNode':
+            printed, _ = self.expression(node.children[0], block)
+            self.emit(block, indent, f"print({printed}, file=_stdout)")
+
+        elif value in ('functionCallNode', 'readLineNode'):
+            self.emit(block, indent, self.expression(node, block)[0])
+
+        else:
+            raise NotTranspilable(f"Unsupported statement {value}")
+
+    def declaration(self, node, block, indent):
+        name = node.children[1].leaf
+        value, static = self.expression(node.children[-1], block)
+
+        if len(node.children) == 4:
+            var_type = node.children[2].leaf
+            if static != var_type:
+                value = f"_declared({value}, {var_type!r}, {node.line!r})"
+        else:
+            var_type = None
+
+        if block.position in block.duplicates:
+            self.emit(block, indent, f"_already_declared({name!r}, {node.line!r}, {value})")
+            return
+
+        variable = next(v for position, v in block.variables[name] if position == block.position)
+        self.emit(block, indent, f"{variable.pyname} = {value}")
+
+        if var_type is not None:
+            variable.declared = repr(var_type)
+            # after the check the value has the declared type, but an Int variable also accepts a Boolean
+            variable.static = var_type if var_type != 'Int' or static == 'Int' else None
+        elif static is not None:
+            variable.declared = repr(static)
+            variable.static = static
+        else:
+            # the type is the one of the first value: it is kept for the checks of the assignments
+            variable.declared = variable.pyname + '_type'
+            self.emit(block, indent, f"{variable.declared} = _getType({variable.pyname})")
+
+    def assignment(self, node, block, indent):
+        name = node.children[0].leaf
+        value, static = self.expression(node.children[1], block)
+
+        # As in SymbolTable.is_variableVar_declared: the innermost variable is assigned
+        # if any visible variable with that name is declared with 'var'
+        target = None
+        assignable = False
+        for variable, certain in block.visible('variables', name):
+            if not certain:
+                raise NotTranspilable(f"Variable '{name}' may be declared after its use, line {node.line}")
+            target = target or variable
+            assignable = assignable or variable.kind == 'var'
+
+        if not assignable:
+            self.emit(block, indent, f"_not_assignable({name!r}, {node.line!r}, {value})")
+            return
+
+        if static is None or repr(static) != target.declared:
+            value = f"_assigned({name!r}, {value}, {target.declared}, {node.line!r})"
+        if target.target is not block.target:
+            block.target.nonlocals.add(target.pyname)
+        self.emit(block, indent, f"{target.pyname} = {value}")
+
+    def function(self, node, block, indent):
+
+        """
+        Errors raised by a function declaration
+        :return: declared Function, None if the declaration raises an error
+        """
+
+        if node.children[1].value == 'functionValueParametersNode':
+            parameters = node.children[1]
+            names = [parameters.children[i].leaf for i in range(0, len(parameters.children), 2)]
+            if len(names) > len(set(names)):
+                self.emit(block, indent, f"_parameters_not_unique({parameters.line!r})")
+                return None
+
+        if block.position in block.duplicates:
+            self.emit(block, indent, f"_function_declared({node.children[0].leaf!r}, {node.line!r})")
+            return None
+
+        return next(f for position, f in block.functions[node.children[0].leaf] if position == block.position)
+
+    def define(self, function, block, indent):
+        node = function.node
+
+        # Body and return value, as in the functionDeclarationNode branch of the interpreter
+        if node.children[-2].value == 'typeParameterNode':
+            if node.children[-1].value == 'statementsNode':
+                body = node.children[-1].children[:-1]
+                returnValue = node.children[-1].children[-1].children[0]
+            else:
+                body = []
+                returnValue = node.children[-1].children[0]
+        else:
+            body = node.children[-1].children
+            returnValue = None
+
+        target = Target(block.target)
+        parameters = Block(self, block, target, boundary=True)
+        parameters.position = 1
+        pynames = []
+        for param_name, param_type in function.parameters:
+            variable = Variable(param_name, 'val', self.pyname('v', param_name))
+            variable.declared = repr(param_type)
+            variable.static = param_type
+            parameters.declare(0, variable)
+            pynames.append(variable.pyname)
+
+        scope = Block(self, parameters, target, body)
+        self.statements(body, scope, 1)
+
+        if returnValue is not None:
+            scope.position = len(body)
+            returned, static = self.expression(returnValue, scope)
+            if function.returnType != 'None' and static != function.returnType:
+                raise NotTranspilable(f"Return type of '{function.name}' can't be checked statically, line {node.line}")
+            target.lines.append(f"    return {returned}")
+
+        self.emit(block, indent, f"def {function.pyname}({', '.join(pynames)}):")
+        if target.nonlocals:
+            self.emit(block, indent + 1, f"nonlocal {', '.join(sorted(target.nonlocals))}")
+        for line in target.lines:
+            self.emit(block, indent, line)
+
+    # Expressions: they return (Python expression, static type or None)
+
+    def expression(self, node, block):
+        value = node.value
+
+        if value == 'termNode':
+            return repr(node.leaf), getType(node.leaf)
+
+        if value == 'IDNode':
+            for variable, certain in block.visible('variables', node.leaf):
+                if not certain:
+                    raise NotTranspilable(f"Variable '{node.leaf}' may be declared after its use, line {node.line}")
+                return variable.pyname, variable.static
+            return f"_not_declared({node.leaf!r}, {node.line!r})", None
+
+        if value in ('+', '-', '*', '/') and len(node.children) == 1:
+            operand, static = self.expression(node.children[0], block)
+            if static == 'Int':
+                return f"(-{operand})", 'Int'
+            return f"_negate({operand}, {node.line!r})", 'Int'
+
+        if value == '!':
+            operand, static = self.expression(node.children[0], block)
+            if static == 'Boolean':
+                return f"(not {operand})", 'Boolean'
+            return f"_not({operand}, {node.line!r})", 'Boolean'
+
+        if value in ('+', '-', '*', '/', '==', '!=', '<', '<=', '>', '>=', '&&', '||'):
+            left, left_type = self.expression(node.children[0], block)
+            right, right_type = self.expression(node.children[1], block)
+            return self.binary(node, left, left_type, right, right_type)
+
+        if value == 'functionCallNode':
+            return self.call(node, block)
+
+        if value == 'readLineNode':
+            if block.root:
+                return f"_not_top_level({node.line!r})", None
+            return "_read_line()", None
+
+        if value == 'intArrayNode':
+            size, _ = self.expression(node.children[0], block)
+            return f"_new_array({size}, {node.line!r})", 'IntArray'
+
+        if value == 'arrayAccessNode':
+            elements, _ = self.expression(node.children[0], block)
+            index, _ = self.expression(node.children[1], block)
+            return f"_array_get({elements}, {index}, {node.line!r})", 'Int'
+
+        if value == 'arraySizeNode':
+            elements, _ = self.expression(node.children[0], block)
+            return f"_array_size({elements}, {node.leaf!r}, {node.line!r})", 'Int'
+
+        raise NotTranspilable(f"Unsupported expression {value}")
+
+    def binary(self, node, left, left_type, right, right_type):
+        op = node.value
+
+        if left_type == right_type == 'Int' and op in ('+', '-', '*'):
+            return f"({left} {op} {right})", 'Int'
+        if left_type == right_type == 'Int' and op == '/':
+            return f"_divide({left}, {right}, {node.line!r})", 'Int'
+        if left_type == 'String' and op == '+':
+            if right_type == 'String':
+                return f"({left} + {right})", 'String'
+            return f"({left} + str({right}))", 'String'
+        if op in ('==', '!=', '<', '<=', '>', '>=') and left_type is not None and left_type == right_type:
+            return f"({left} {op} {right})", 'Boolean'
+        if op in ('&&', '||'):
+            # The right operand is evaluated only if the left one doesn't decide the result
+            decides = op == '||'
+            if left_type == right_type == 'Boolean':
+                return f"({left} {'and' if op == '&&' else 'or'} {right})", 'Boolean'
+            if left_type == 'Boolean':
+                return f"({left} {'and' if op == '&&' else 'or'} " \
+                       f"_binary({self.constant(op, node.line)}, {not decides}, {right}))", 'Boolean'
+            temporary = self.temporary()
+            return f"({temporary} if ({temporary} := {left}) is {decides} " \
+                   f"else _binary({self.constant(op, node.line)}, {temporary}, {right}))", 'Boolean'
+
+        # Generic path: same checks and errors of the interpreter
+        if op in ('-', '*', '/'):
+            static = 'Int' # Boolean operands are accepted as Int, but the result is an Int anyway
+        elif op == '+':
+            static = None
+        else:
+            static = 'Boolean'
+        return f"_binary({self.constant(op, node.line)}, {left}, {right})", static
+
+    def call(self, node, block):
+        name = node.children[0].leaf
+        if block.root:
+            return f"_not_top_level({node.line!r})", None
+
+        arguments = []
+        types = []
+        if len(node.children) > 1:
+            for argument in node.children[1].children:
+                code, static = self.expression(argument, block)
+                arguments.append(code)
+                types.append(static)
+        known = None not in types
+        packed = f"({', '.join(arguments)}{',' if len(arguments) == 1 else ''})"
+
+        candidates = []
+        for function, certain in block.visible('functions', name):
+            if len(function.types) != len(types) \
+                    or any(t is not None and t != p for t, p in zip(types, function.types)):
+                continue
+            if not certain:
+                raise NotTranspilable(f"Function '{name}' may be declared after its use, line {node.line}")
+            candidates.append(function)
+            if known:
+                break
+
+        if not candidates:
+            return f"_no_function({name!r}, {node.line!r}, {packed})", None
+
+        returnTypes = {f.returnType for f in candidates}
+        static = returnTypes.pop() if len(returnTypes) == 1 else None
+
+        if known:
+            return f"{candidates[0].pyname}({', '.join(arguments)})", static
+
+        overloads = ', '.join(f"({f.types!r}, {f.pyname})" for f in candidates)
+        return f"_dispatch({name!r}, {node.line!r}, {packed}, ({overloads},))", static
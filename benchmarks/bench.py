@@ -0,0 +1,20 @@
+# Helpers shared by the benchmarks: the repository on the import path and the timing of a function.
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def best(function, repeat=5):
+    # Seconds of the fastest of some calls (the others were slowed down by the rest of the machine)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def row(*cells):
+    print('  '.join(f"{cell:>14}" if not isinstance(cell, float) else f"{cell:>14.4f}" for cell in cells))
@@ -0,0 +1,58 @@
+# Bulk fill and sum loops over an IntArray, compared with the same sum computed without an array.
+# Loops run at most 1000 iterations, so the largest arrays have 1000 elements.
+#
+#   python benchmarks/intarray.py
+
+import io
+import sys
+
+from bench import best, row
+
+from PreparedProgram import PreparedProgram
+
+FILL = """
+fun main() {
+    val a = IntArray(SIZE)
+    for (i in 0 .. SIZE - 1) {
+        a[i] = i * 3
+    }
+}
+"""
+
+SUM = """
+fun main() {
+    val a = IntArray(SIZE)
+    for (i in 0 .. SIZE - 1) {
+        a[i] = i * 3
+    }
+    var total = 0
+    for (i in 0 .. a.size - 1) {
+        total = total + a[i]
+    }
+    println(total)
+}
+"""
+
+# The same values, recomputed instead of stored
+SCALAR = """
+fun main() {
+    var total = 0
+    for (i in 0 .. SIZE - 1) {
+        total = total + i * 3
+    }
+    println(total)
+}
+"""
+
+def main(repeat=5):
+    row('program', 'size', 'seconds', 'optimized')
+    for name, source in (('fill', FILL), ('fill + sum', SUM), ('scalar sum', SCALAR)):
+        for size in (100, 1000):
+            text = source.replace('SIZE', str(size))
+            plain = PreparedProgram(text)
+            optimized = PreparedProgram(text, optimize=True)
+            row(name, size, best(lambda: plain.run(stdout=io.StringIO()), repeat),
+                best(lambda: optimized.run(stdout=io.StringIO()), repeat))
+
+if __name__ == '__main__':
+    main(*[int(argument) for argument in sys.argv[1:]])
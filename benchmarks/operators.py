@@ -0,0 +1,57 @@
+# Microbenchmarks of the operator families: each loop body is dominated by one family of operators
+# and runs with the specialized operator nodes and with the generic path only.
+#
+#   python benchmarks/operators.py
+
+import io
+import sys
+
+from bench import best, row
+
+from Interpreter import Interpreter
+from PreparedProgram import PreparedProgram
+
+BODIES = {
+    'Int + - * /': "a = a + i * 2 - i / 3 + k",
+    'Int comparisons': "c = i < k == (k >= i) != (i > 3)",
+    'String +': 's = "v" + i + k + "w"',
+    'Boolean && ||': "c = i > 3 && k < 7 || i == k && c",
+    'short-circuit': "c = i < 0 && slow(i) || i >= 0 || slow(k)", # the calls are skipped
+}
+
+SOURCE = """
+fun slow(n: Int): Boolean {
+    var t = 0
+    for (j in 0 .. 20) {
+        t = t + j
+    }
+    return t > n
+}
+fun main() {
+    var a = 0
+    var s = "x"
+    var c = true
+    for (k in 0 .. 40) {
+        for (i in 0 .. 40) {
+            BODY
+        }
+    }
+}
+"""
+
+class GenericInterpreter(Interpreter):
+    # Operator nodes are never specialized
+    @staticmethod
+    def specialize(op, left, right):
+        return 'generic'
+
+def main(repeat=5):
+    row('operators', 'specialized', 'generic', 'speedup')
+    for name, body in BODIES.items():
+        program = PreparedProgram(SOURCE.replace('BODY', body))
+        specialized = best(lambda: program.run(stdout=io.StringIO()), repeat)
+        generic = best(lambda: GenericInterpreter(stdout=io.StringIO()).evaluate(program.tree), repeat)
+        row(name, specialized, generic, f"{generic / specialized:.2f}")
+
+if __name__ == '__main__':
+    main(*[int(argument) for argument in sys.argv[1:]])
@@ -0,0 +1,40 @@
+# Overflow-heavy arithmetic loops (a multiplicative hash) with unbounded Python integers and with
+# the 32-bit Int mode, where every result wraps around instead of growing into a big integer.
+#
+#   python benchmarks/overflow.py [calls]
+
+import io
+import sys
+
+from bench import best, row
+
+from PreparedProgram import PreparedProgram
+
+SOURCE = """
+fun hash(seed: Int): Int {
+    var h = seed
+    for (i in 0 .. 999) {
+        h = h * 1103515245 + 12345 + i
+    }
+    return h
+}
+fun main() {
+    var total = 0
+    for (k in 0 .. CALLS - 1) {
+        total = total + hash(k)
+    }
+    println(total > 0)
+}
+"""
+
+def main(calls=50, repeat=3):
+    source = SOURCE.replace('CALLS', str(calls))
+    row('Int', 'seconds', 'optimized')
+    for name, options in (('unbounded', {}), ('int32', {'int32': True})):
+        plain = PreparedProgram(source, **options)
+        optimized = PreparedProgram(source, optimize=True, **options)
+        row(name, best(lambda: plain.run(stdout=io.StringIO()), repeat),
+            best(lambda: optimized.run(stdout=io.StringIO()), repeat))
+
+if __name__ == '__main__':
+    main(*[int(argument) for argument in sys.argv[1:]])
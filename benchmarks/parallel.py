@@ -0,0 +1,45 @@
+# Speedup of the parallel calls on a recursive workload: the two recursive calls of fib() start together
+# in a process pool, against a sequential run (the time includes starting the pool).
+#
+#   python benchmarks/parallel.py [n]
+
+import io
+import os
+import sys
+
+from bench import best, row
+
+from PreparedProgram import PreparedProgram
+
+SOURCE = """
+fun fib(n: Int): Int {
+    var r = n
+    if (n > 1) {
+        r = fib(n - 1) + fib(n - 2)
+    }
+    return r
+}
+fun main() {
+    println(fib(N))
+}
+"""
+
+def run(source, **options):
+    program = PreparedProgram(source, **options)
+    try:
+        program.run(stdout=io.StringIO())
+    finally:
+        program.close()
+
+def main(n=20, repeat=3):
+    source = SOURCE.replace('N', str(n))
+    sequential = best(lambda: run(source), repeat)
+
+    row('processes', 'seconds', 'speedup')
+    row('sequential', sequential, '1.00')
+    for workers in sorted({1, 2, 4, 8, os.cpu_count() or 1}):
+        seconds = best(lambda: run(source, parallel=True, workers=workers), repeat)
+        row(workers, seconds, f"{sequential / seconds:.2f}")
+
+if __name__ == '__main__':
+    main(*[int(argument) for argument in sys.argv[1:]])
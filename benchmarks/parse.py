@@ -0,0 +1,33 @@
+# Parse time of a generated source with many top-level functions: one LALR pass (Parser.parse)
+# against ParallelParser.parse_parallel with a growing number of processes.
+#
+#   python benchmarks/parse.py [functions]
+
+import os
+import sys
+
+from bench import best, row
+
+from Parser import parse
+from ParallelParser import parse_parallel
+
+def source(functions):
+    lines = []
+    for n in range(functions):
+        lines.append(f"fun f{n}(x: Int): Int {{\n    var y = x * {n}\n    if (y > 10) {{\n        y = y - 10\n    }}\n"
+                     f"    return y + {n}\n}}")
+    lines.append("fun main() {\n    println(f0(1))\n}")
+    return "\n".join(lines) + "\n"
+
+def main(functions=2000, repeat=3):
+    text = source(functions)
+    single = best(lambda: parse(text), repeat)
+
+    row('processes', 'seconds', 'speedup')
+    row('1 (one pass)', single, '1.00')
+    for workers in sorted({2, 4, 8, os.cpu_count() or 1} - {1}):
+        seconds = best(lambda: parse_parallel(text, workers), repeat)
+        row(workers, seconds, f"{single / seconds:.2f}")
+
+if __name__ == '__main__':
+    main(*[int(argument) for argument in sys.argv[1:]])
@@ -0,0 +1,34 @@
+# A library-heavy program: many top-level functions (each calling the previous one) and a main()
+# that uses a few of them. With prune=True the functions that can't be reached from main() are removed
+# when the program is prepared, so each run declares only the reachable ones.
+#
+#   python benchmarks/reachability.py [functions] [used]
+
+import io
+import sys
+
+from bench import best, row
+
+from PreparedProgram import PreparedProgram
+
+def source(functions, used):
+    lines = ["fun lib0(x: Int): Int {\n    return x + 1\n}"]
+    for n in range(1, functions):
+        lines.append(f"fun lib{n}(x: Int): Int {{\n    var y = lib{n - 1}(x)\n    if (y > 100) {{\n        y = y - 100\n"
+                     f"    }}\n    return y * 2\n}}")
+    calls = "\n".join(f"    println(lib{n}({n}))" for n in range(used))
+    lines.append(f"fun main() {{\n{calls}\n}}")
+    return "\n".join(lines) + "\n"
+
+def main(functions=500, used=5, repeat=3):
+    text = source(functions, used)
+
+    row('program', 'prepare', 'run', 'functions')
+    for name, options in (('whole', {}), ('pruned', {'prune': True})):
+        program = PreparedProgram(text, **options)
+        prepare = best(lambda: PreparedProgram(text, **options), repeat)
+        run = best(lambda: program.run(stdout=io.StringIO()), repeat)
+        row(name, prepare, run, functions - len(program.removed))
+
+if __name__ == '__main__':
+    main(*[int(argument) for argument in sys.argv[1:]])
@@ -0,0 +1,39 @@
+# Startup time of a script with many top-level declarations: a full run (parse and initialization included),
+# a run of the prepared program (initialization included) and a run forked from a snapshot,
+# that starts directly from main().
+#
+#   python benchmarks/snapshot.py [declarations]
+
+import io
+import os
+import sys
+import tempfile
+
+from bench import best, row
+
+from PreparedProgram import PreparedProgram
+from Snapshot import Snapshot
+
+def source(declarations):
+    lines = []
+    for n in range(declarations):
+        lines.append(f"val c{n} = {n} * 2 + 1")
+        lines.append(f"fun f{n}(x: Int): Int {{\n    return x + c{n}\n}}")
+    lines.append("fun main() {\n    println(f0(1))\n}")
+    return "\n".join(lines) + "\n"
+
+def main(declarations=500, repeat=5):
+    text = source(declarations)
+    program = PreparedProgram(text)
+    path = os.path.join(tempfile.mkdtemp(), 'program.snapshot')
+    program.snapshot().save(path)
+    snapshot = Snapshot.load(path)
+
+    row('start', 'seconds')
+    row('parse + run', best(lambda: PreparedProgram(text).run(stdout=io.StringIO()), repeat))
+    row('prepared run', best(lambda: program.run(stdout=io.StringIO()), repeat))
+    row('snapshot run', best(lambda: snapshot.run(stdout=io.StringIO()), repeat))
+    row('load + run', best(lambda: Snapshot.load(path).run(stdout=io.StringIO()), repeat))
+
+if __name__ == '__main__':
+    main(*[int(argument) for argument in sys.argv[1:]])
@@ -0,0 +1,47 @@
+# Runs of one PreparedProgram from a growing number of threads: every run has its own interpreter,
+# so the throughput is limited by the interpreter lock only, not by shared state.
+#
+#   python benchmarks/threads.py [runs]
+
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from bench import best, row
+
+from PreparedProgram import PreparedProgram
+
+SOURCE = """
+fun work(n: Int): Int {
+    var total = 0
+    for (i in 0 .. n) {
+        var j = 0
+        while (j < 20) {
+            total = total + i * j
+            j = j + 1
+        }
+    }
+    return total
+}
+fun main() {
+    println(work(100))
+}
+"""
+
+def main(runs=16):
+    program = PreparedProgram(SOURCE)
+
+    def run_all(threads):
+        with ThreadPoolExecutor(threads) as executor:
+            list(executor.map(lambda _: program.run(stdout=io.StringIO()), range(runs)))
+
+    row('threads', 'seconds', 'runs/second', 'speedup')
+    single = None
+    for threads in sorted({1, 2, 4, 8, 16, os.cpu_count() or 1}):
+        seconds = best(lambda: run_all(threads), repeat=3)
+        single = single or seconds
+        row(threads, seconds, f"{runs / seconds:.1f}", f"{single / seconds:.2f}")
+
+if __name__ == '__main__':
+    main(*[int(argument) for argument in sys.argv[1:]])
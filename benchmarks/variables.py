@@ -0,0 +1,64 @@
+# Memory and lookup time of 100k declared variables: the slotted records of SymbolTable against
+# the dict layout they replaced, whose lookups recursed through the parent scopes (DictTable is a copy
+# of the old code). Memory is the traced allocation of the records only (the names and the values are
+# allocated first); reads are timed from the scope of the declarations and from a scope some levels below it.
+#
+#   python benchmarks/variables.py [variables] [depth]
+
+import sys
+import tracemalloc
+
+from bench import best, row
+
+from SymbolTable import SymbolTable
+
+class DictTable:
+    # Variables of the SymbolTable before the slotted records
+    def __init__(self, parent, name):
+        self.variables = {}
+        self.functions = {}
+        self.parent = parent
+        self.name = name
+
+    def declare_variable(self, v, name, value, var_type, line):
+        if name in self.variables:
+            raise Exception(f"Variable '{name}' already declared, line {line}")
+        self.variables[name] = {'declaration': v, 'type': var_type, 'value': value}
+
+    def get_variable(self, name):
+        if name in self.variables:
+            return self.variables[name]['value']
+        elif self.parent:
+            return self.parent.get_variable(name)
+
+def traced(function):
+    # Bytes still allocated by a function when it returns (its result is kept alive)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = function()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, result
+
+def main(count=100000, depth=8):
+    names = [f"v{n}" for n in range(count)]
+    values = list(range(1000, 1000 + count))
+
+    def declare(table_class):
+        table = table_class(None, 'Root')
+        for name, value in zip(names, values):
+            table.declare_variable('var', name, value, 'Int', 1)
+        return table
+
+    row('layout', 'bytes/variable', 'read depth 0', f"read depth {depth}")
+    for layout, table_class in (('slotted records', SymbolTable), ('dicts', DictTable)):
+        used, table = traced(lambda: declare(table_class))
+        inner = table
+        for _ in range(depth):
+            inner = table_class(inner, 'if')
+        shallow = best(lambda: [table.get_variable(name) for name in names])
+        deep = best(lambda: [inner.get_variable(name) for name in names])
+        row(layout, f"{used / count:.1f}", shallow, deep)
+
+if __name__ == '__main__':
+    main(*[int(argument) for argument in sys.argv[1:]])
@@ -0,0 +1,32 @@
+# Differential check of the loop optimizer: every program must print the same output and end with the same
+# result or error with and without optimize=True.
+# Besides the test cases and the generated programs, loops with invariant expressions and induction variables
+# are generated, also with calls that change a variable used by the loop.
+#
+#   python checks/check_optimizer.py [generated programs] [seed]
+
+import sys
+
+from programs import Generator, quiet, run, test_sources
+
+def main(count=300, seed=0):
+    generator = Generator(seed)
+    programs = list(test_sources()) + [(f"generated {n}", generator.program()) for n in range(count)] \
+        + [(f"loop {n}", generator.loop_program()) for n in range(count)]
+
+    differences = 0
+    for name, source in programs:
+        with quiet():
+            expected = run(source)
+            actual = run(source, optimize=True)
+        if actual != expected:
+            differences += 1
+            print(f"{name}: the optimized program differs\n{source}\n--- tree walker\n{expected}\n"
+                  f"--- optimized\n{actual}\n")
+
+    print(f"{len(programs)} programs, {differences} differences")
+    return differences == 0
+
+if __name__ == '__main__':
+    arguments = [int(argument) for argument in sys.argv[1:]]
+    sys.exit(0 if main(*arguments) else 1)
@@ -0,0 +1,47 @@
+# Stress check of the runs from multiple threads: each test case is prepared once (with each set of options)
+# and run many times from a thread pool; every run must print the same output and end in the same way
+# as a run of a single thread.
+#
+#   python checks/check_threads.py [runs] [threads]
+
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from programs import INPUT, quiet, test_sources
+
+from PreparedProgram import PreparedProgram
+
+OPTIONS = [{}, {'optimize': True}, {'transpile': True}, {'int32': True}, {'trim': True}]
+
+def outcome(program):
+    output = io.StringIO()
+    try:
+        result = f"OK {program.run(io.StringIO(INPUT), output)!r}"
+    except Exception as e:
+        result = f"{type(e).__name__}: {e}"
+    return output.getvalue() + result
+
+def main(runs=400, threads=16):
+    with quiet():
+        programs = [(f"{name} {options}", PreparedProgram(source, **options))
+                    for name, source in test_sources() for options in OPTIONS]
+    expected = [outcome(program) for _, program in programs]
+
+    jobs = [index % len(programs) for index in range(runs)]
+    with ThreadPoolExecutor(threads) as executor:
+        results = list(executor.map(lambda index: outcome(programs[index][1]), jobs))
+
+    differences = 0
+    for index, result in zip(jobs, results):
+        if result != expected[index]:
+            differences += 1
+            print(f"{programs[index][0]}: a threaded run differs\n--- expected\n{expected[index]}\n"
+                  f"--- got\n{result}\n")
+
+    print(f"{runs} runs of {len(programs)} programs over {threads} threads, {differences} differences")
+    return differences == 0
+
+if __name__ == '__main__':
+    arguments = [int(argument) for argument in sys.argv[1:]]
+    sys.exit(0 if main(*arguments) else 1)
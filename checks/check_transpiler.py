@@ -0,0 +1,42 @@
+# Differential check of the transpiler: every program must print the same output and end with the same
+# result or error when it is interpreted and when it is compiled to Python.
+# All the programs share one Transpiler, so programs whose trees collide in its cache are detected too,
+# and they are compiled from several threads at the same time.
+#
+#   python checks/check_transpiler.py [generated programs] [seed] [threads]
+
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from programs import Generator, quiet, run, test_sources
+
+from Transpiler import Transpiler
+
+# Programs with the same nodes in pre-order, but different trees
+SAME_NODES = ["fun main() {\nif (false) { println(1) }\nprintln(2)\n}\n",
+              "fun main() {\nif (false) { println(1)\nprintln(2) }\n}\n"]
+
+def main(count=300, seed=0, threads=8):
+    transpiler = Transpiler()
+    generator = Generator(seed)
+    programs = list(test_sources()) + [(f"same nodes {n}", source) for n, source in enumerate(SAME_NODES)] \
+        + [(f"generated {n}", generator.program()) for n in range(count)]
+
+    with quiet(), ThreadPoolExecutor(threads) as executor:
+        transpiled = list(executor.map(lambda program: run(program[1], transpile=True, transpiler=transpiler),
+                                       programs))
+        interpreted = [run(source) for _, source in programs]
+
+    differences = 0
+    for (name, source), expected, actual in zip(programs, interpreted, transpiled):
+        if actual != expected:
+            differences += 1
+            print(f"{name}: the transpiled program differs\n{source}\n--- interpreted\n{expected}\n"
+                  f"--- transpiled\n{actual}\n")
+
+    print(f"{len(programs)} programs, {differences} differences, {len(transpiler.cache)} compiled")
+    return differences == 0
+
+if __name__ == '__main__':
+    arguments = [int(argument) for argument in sys.argv[1:]]
+    sys.exit(0 if main(*arguments) else 1)
@@ -0,0 +1,162 @@
+# Programs shared by the checks: the test cases and randomly generated programs,
+# and a run that turns the output and the outcome of a program into a string to compare.
+
+import contextlib
+import io
+import os
+import random
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from PreparedProgram import PreparedProgram
+
+INPUT = "Alice\n3\n" # read by the programs that call readLine()
+
+def test_sources():
+    # (name, source) of the test cases in Tests/
+    folder = os.path.join(ROOT, 'Tests')
+    for name in sorted(os.listdir(folder), key=lambda name: int(name[len('test_case_'):-len('.kt')])):
+        with open(os.path.join(folder, name), 'r') as file:
+            yield name, file.read()
+
+def run(source, stdin=INPUT, **options):
+
+    """
+    Prepare and execute a program
+    :param source: Kotlin source code
+    :param stdin: text read by readLine()
+    :param options: options of PreparedProgram
+    :return: output followed by the outcome of the run (returned value or error)
+
+    The messages of the parser are printed on the standard output (see quiet)
+    """
+
+    output = io.StringIO()
+    program = None
+    try:
+        program = PreparedProgram(source, **options)
+        outcome = f"OK {program.run(io.StringIO(stdin), output)!r}"
+    except RecursionError:
+        return "RecursionError" # the output depends on the stack available to the thread
+    except Exception as e:
+        outcome = f"{type(e).__name__}: {e}"
+    finally:
+        if program is not None:
+            program.close()
+    return output.getvalue() + outcome
+
+def quiet():
+    # Hide the messages of the parser (the redirection is global: enter it once, not in each thread)
+    return contextlib.redirect_stdout(io.StringIO())
+
+class Generator:
+    def __init__(self, seed=0):
+
+        """
+        Random programs with nested blocks, shadowing declarations, loops, overloads and nested functions
+        (many of them end with an error: the errors have to be the same too)
+        :param seed: seed of the random generator
+        """
+
+        self.random = random.Random(seed)
+        self.names = ['a', 'b', 'c', 'x']
+
+    def expression(self, depth=0):
+        choice = self.random.random()
+        if depth > 2 or choice < 0.35:
+            return self.random.choice(self.names + [str(self.random.randint(0, 4)), 'true', 'false', '"s"',
+                                                    'readLine()', 'arr[1]', 'arr.size', 'g(1)', 'g(true)', 'h()'])
+        if choice < 0.45:
+            return '-' + self.expression(depth + 1)
+        if choice < 0.5:
+            return '!' + self.expression(depth + 1)
+        op = self.random.choice(['+', '-', '*', '/', '==', '!=', '<', '>=', '&&', '||', '+', '+'])
+        return f"({self.expression(depth + 1)} {op} {self.expression(depth + 1)})"
+
+    def block(self, depth, count):
+        return "\n".join(self.statements(depth, count))
+
+    def statements(self, depth, count):
+        lines = []
+        for _ in range(count):
+            choice = self.random.random()
+            name = self.random.choice(self.names)
+            if choice < 0.2:
+                var_type = self.random.choice(['', ': Int', ': String', ': Boolean'])
+                lines.append(f"{self.random.choice(['var', 'val'])} {name}{var_type} = {self.expression()}")
+            elif choice < 0.4:
+                lines.append(f"{name} = {self.expression()}")
+            elif choice < 0.5:
+                lines.append(f"println({self.expression()})")
+            elif choice < 0.55:
+                lines.append(f"arr[{self.random.randint(0, 3)}] = {self.expression()}")
+            elif choice < 0.65 and depth < 3:
+                otherwise = f" else {{\n{self.block(depth + 1, 2)}\n}}" if self.random.random() < 0.5 else ""
+                lines.append(f"if ({self.expression()}) {{\n{self.block(depth + 1, self.random.randint(0, 3))}\n}}"
+                             + otherwise)
+            elif choice < 0.72 and depth < 3:
+                order = self.random.choice(['..', 'downTo'])
+                lines.append(f"for ({name} in {self.expression()} {order} {self.random.randint(0, 4)}) {{\n"
+                             f"{self.block(depth + 1, self.random.randint(0, 3))}\n}}")
+            elif choice < 0.78 and depth < 3:
+                lines.append(f"var w{depth} = 0\nwhile (w{depth} < 3) {{\nw{depth} = w{depth} + 1\n"
+                             f"{self.block(depth + 1, self.random.randint(0, 2))}\n}}")
+            elif choice < 0.86 and depth < 2:
+                return_type = self.random.choice(['', ': ' + self.random.choice(['Int', 'String', 'Boolean'])])
+                body = self.block(depth + 1, self.random.randint(0, 3))
+                if return_type:
+                    body += f"\nreturn {self.expression()}"
+                parameters = self.random.choice(['', 'y: Int', 'y: Boolean', 'a: Int'])
+                lines.append(f"fun {self.random.choice(['g', 'h', 'k'])}({parameters}){return_type} {{\n{body}\n}}")
+            elif choice < 0.93:
+                lines.append(self.random.choice(['g(1)', 'h()', 'k()', 'g(a)', 'k(x)']))
+            else:
+                lines.append(f"println({self.expression()})")
+        return lines
+
+    def program(self):
+        values = ['1', '2', 'true', '"q"']
+        lines = [f"var {name} = {self.random.choice(values)}" for name in self.names if self.random.random() < 0.7]
+        lines.append("val arr = IntArray(4)")
+        lines.append("fun g(y: Int): Int {\nreturn y + 1\n}")
+        lines.append(f"fun main() {{\n{self.block(0, self.random.randint(2, 8))}\n}}")
+        return "\n".join(lines) + "\n"
+
+    def arithmetic(self, names, depth=0):
+        if depth > 2 or self.random.random() < 0.3:
+            return self.random.choice(names + [str(self.random.randint(0, 5))])
+        op = self.random.choice(['+', '-', '*', '/'])
+        return f"({self.arithmetic(names, depth + 1)} {op} {self.arithmetic(names, depth + 1)})"
+
+    def loop_program(self):
+        # Nested loops with invariant expressions, induction variables and calls that change a global
+        names = ['i', 'n', 'm', 'acc']
+        body = [f"acc = acc + {self.arithmetic(names)}" for _ in range(self.random.randint(1, 4))]
+        if self.random.random() < 0.3:
+            body.append("m = m + 1")
+        if self.random.random() < 0.3:
+            body.append("val n = 3")
+        if self.random.random() < 0.3:
+            body.append("acc = acc + bump()")
+        inner = "\n".join(body)
+        return f"""var m = 2
+fun bump(): Int {{
+    m = m + 1
+    return m
+}}
+fun main() {{
+    val n = {self.random.randint(0, 4)}
+    var acc = 0
+    for (i in {self.random.randint(-3, 3)} .. {self.random.randint(0, 9)} step {self.random.randint(1, 3)}) {{
+        {inner}
+        var w = 0
+        while (w < n * 2 + m) {{
+            w = w + 1
+            acc = acc + w * m - i * 3
+        }}
+    }}
+    println(acc)
+}}
+"""